@@ -1,37 +1,31 @@
 """
 Main program for LED light show with button control
 """
-import time
-from mylib.hardware import init_hardware
-from mylib.lightshow import light_show
-from mylib.button import button_handler
+from mylib.hardware import init_hardware, init_alarm, init_nvm, boot_timer
+from mylib.app import build
 
 def main():
+    boot = boot_timer()
+    nvm = init_nvm()
     # Initialize all hardware (with fallbacks if missing)
-    led, button, pixel, pixel32, mic = init_hardware()
+    led, button, pixel, pixel32, mic = init_hardware(nvm, boot)
     
-    # Create light show controller
-    show = light_show(led, pixel, pixel32)
-    
-    # Create button handler
-    handler = button_handler(button, show)
+    # Create light show controller, button handler and main loop tasks
+    show, handler, sched = build(led, button, pixel, pixel32, mic, alarm=init_alarm(), nvm=nvm)
+    boot.mark("build")
+    # Draw the first frame before anything else (target: under 300 ms from power-on)
+    show.animate_step()
+    boot.mark("first frame")
+    boot.report()
     
     print("\nStarting main loop. Short/medium/long button presses will be handled.")
-    print("- Short press: change color set")
-    print("- Medium press: change mode (flags/explosions/glitter/brightness)")
-    print("- Long press: turn off/on")
+    print("- Short press: change color set (double click: previous set)")
+    print("- Click, then press and hold: ramp brightness")
+    print("- Medium press: change mode (flags/explosions/glitter/brightness/VU meter/spectrum)")
+    print("- Long press: turn off (light sleep) / hold again to turn on")
     
-    while True:
-        # Update button handler (interrupt-driven) - check this first
-        handler.update()
-        
-        # Only update animation if button feedback is not being shown
-        # This prevents the animation from overlaying the button press feedback
-        if not handler.is_showing_feedback():
-            show.animate_step() # Animate Step
-        
-        # Keep CPU friendly - shorter sleep for more responsive button handling
-        time.sleep(0.001)  # 1ms for faster interrupt-like response
+    # Sleep exactly until the earliest deadline instead of waking every 1ms
+    sched.run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,114 @@
+# Wiring shared by code.py on the board and the host simulator:
+# the light show, the button handler and the scheduler tasks that drive them
+from mylib.lightshow import light_show
+from mylib.button import button_handler
+from mylib.scheduler import scheduler
+from mylib.gcpolicy import gc_policy
+from mylib.power import power_manager
+from mylib.settings import settings_store
+from mylib.perf import perf_stats, timed_pixels, serial_console, ticks_us, ticks_diff
+try:
+    from micropython import const  # pyright: ignore[reportMissingImports]
+except ImportError:
+    def const(x):
+        return x
+
+# Frame timing histograms and per-mode allocation counts; const(0) compiles every measurement out
+PERF = const(1)
+
+def build(led, button, pixel, pixel32, mic, clock=None, alarm=None, nvm=None):
+    """Create the show, button handler and main loop scheduler for the given hardware
+    All three share one clock: the system clock unless a virtual one is passed in.
+    With an alarm module the board light-sleeps while the show is off; with nvm the
+    mode, sets and brightness survive a power cycle.
+    """
+    show = light_show(led, pixel, pixel32, mic, clock)
+    # Saved settings are applied before the first frame is drawn
+    settings = settings_store(nvm)
+    settings.restore(show)
+    handler = button_handler(button, show)
+    sched = scheduler(show.clock)
+    perf = None
+    if PERF:
+        perf = perf_stats(show.clock, [m.name for m in show.modes])
+        show.pixel32 = timed_pixels(show.pixel32, perf.wire, perf.alloc)
+        # A long press turns the show off and prints what the session looked like
+        show.on_off = lambda: perf.print_summary(sched)
+
+    def poll_button(now):
+        if PERF:
+            start = ticks_us()
+            handler.update()
+            perf.button.add(ticks_diff(ticks_us(), start))
+        else:
+            handler.update()
+        if show.frame_period() < frame_task.period:
+            # A press just put up an indicator or the progress bar: draw it now, not at
+            # the deadline the mode's slower frame period already scheduled
+            sched.wake(frame_task, now)
+        return handler.next_deadline(now)
+
+    def capture(now):
+        # Only while a mode listens: a lazy mic isn't even opened before then.
+        # Not returned: a number from a task would be taken as its next deadline
+        if show.active and show.modes[show.mode].listens:
+            show.capture.capture(now)
+
+    def animate(now):
+        # Button feedback is a layer on top, so the animation keeps running underneath
+        if PERF:
+            start = ticks_us()
+            perf.frame_started(start)
+            perf.late.add(int((now - frame_task.next) * 1000000))
+            perf.alloc.begin()
+            show.animate_step(now)
+            perf.alloc.end(show.mode)
+            perf.render.add(ticks_diff(ticks_us(), start))
+        else:
+            show.animate_step(now)
+        frame_task.period = show.frame_period()
+        palette_task.period = show.step_period()
+        if analysis_task is not None:
+            analysis_task.period = show.analysis_period()
+
+    # Button first so a press is handled before the frame that follows it
+    sched.add("button", poll_button, handler.input.POLL_PERIOD)
+    frame_task = sched.add("frame", animate, show.frame_period())
+    palette_task = sched.add("palette", show.step_palette, show.step_period())
+    if settings.enabled:
+        sched.add("settings", lambda now: settings.update(show, now), settings.PERIOD)
+    analysis_task = None
+    if mic is not None:
+        # The mic is read one block per block period into the capture ring, apart from
+        # the frame work; levels and beat tracking then catch up on every new block,
+        # and the spectrum's FFT runs a slice at a time between frames. Its slices come
+        # every few ms, so it's deferrable: garbage collection still finds idle time
+        sched.add("capture", capture, show.capture.block_period())
+        sched.add("audio", show.update_audio, 0.02)
+        analysis_task = sched.add("analysis", show.analyze_audio, show.analysis_period(), deferrable=True)
+    if PERF:
+        console = serial_console()
+        if console is not None:
+            def poll_console(now):
+                # 'p' prints the timing summary, 'r' starts a fresh one
+                key = console()
+                if key == "p":
+                    perf.print_summary(sched)
+                elif key == "r":
+                    perf.reset(sched)
+            sched.add("console", poll_console, 0.25)
+    # Collect garbage between frames rather than whenever an allocation runs out of heap,
+    # and sleep until the next press while the show is off
+    gc_idle = gc_policy(perf.gc if PERF else None).idle
+    power = power_manager(handler, show, sched, alarm)
+    if power.enabled:
+        def idle(now, deadline):
+            gc_idle(now, deadline)
+            power.idle(now, deadline)
+        sched.idle = idle
+    else:
+        sched.idle = gc_idle
+    show.power = power
+    show.settings = settings
+    show.perf = perf
+    return show, handler, sched
@@ -0,0 +1,78 @@
+# Generated by software/utility/compile_assets.py from software/assets/patterns.json
+# Do not edit: change the description and run the compiler again
+
+WIDTH = 8
+HEIGHT = 4
+FRAME_BYTES = 96
+
+# Flags: names, rendered RGB frames back to back, palettes and spark colors as RGB triples
+FLAG_NAMES = ('France', 'Philippines', 'Canada', 'USA', 'EU')
+FLAG_FRAMES = (
+    b"\x00\x00\xff\x00\x00\xff\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80"
+    b"\x80\x80\xff\x00\x00\xff\x00\x00\x00\x00\xff\x00\x00\xff\x80\x80"
+    b"\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\xff\x00\x00\xff\x00\x00"
+    b"\x00\x00\xff\x00\x00\xff\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80"
+    b"\x80\x80\xff\x00\x00\xff\x00\x00\x00\x00\xff\x00\x00\xff\x80\x80"
+    b"\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\xff\x00\x00\xff\x00\x00"
+    b"\x80\x80\x80\x80\x80\x80\x00\x00\xff\x00\x00\xff\x00\x00\xff\x00"
+    b"\x00\xff\x00\x00\xff\x00\x00\xff\x80\x80\x80\x80\x80\x80\xff\xc8"
+    b"\x00\x80\x80\x80\x00\x00\xff\x00\x00\xff\x00\x00\xff\x00\x00\xff"
+    b"\x80\x80\x80\x80\x80\x80\x80\x80\x80\xff\x00\x00\xff\x00\x00\xff"
+    b"\x00\x00\xff\x00\x00\xff\x00\x00\x80\x80\x80\xff\x00\x00\xff\x00"
+    b"\x00\xff\x00\x00\xff\x00\x00\xff\x00\x00\xff\x00\x00\xff\x00\x00"
+    b"\xff\x00\x00\xff\x00\x00\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80"
+    b"\x80\x80\xff\x00\x00\xff\x00\x00\xff\x00\x00\xff\x00\x00\x80\x80"
+    b"\x80\xff\x00\x00\xff\x00\x00\x80\x80\x80\xff\x00\x00\xff\x00\x00"
+    b"\xff\x00\x00\xff\x00\x00\x80\x80\x80\xff\x00\x00\xff\x00\x00\x80"
+    b"\x80\x80\xff\x00\x00\xff\x00\x00\xff\x00\x00\xff\x00\x00\x80\x80"
+    b"\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\xff\x00\x00\xff\x00\x00"
+    b"\x00\x00\xff\x00\x00\xff\x00\x00\xff\xff\x00\x00\xff\x00\x00\xff"
+    b"\x00\x00\xff\x00\x00\xff\x00\x00\x00\x00\xff\x00\x00\xff\x00\x00"
+    b"\xff\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80"
+    b"\xff\x00\x00\xff\x00\x00\xff\x00\x00\xff\x00\x00\xff\x00\x00\xff"
+    b"\x00\x00\xff\x00\x00\xff\x00\x00\x80\x80\x80\x80\x80\x80\x80\x80"
+    b"\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80\x80"
+    b"\x00\x33\x99\x00\x33\x99\x00\x33\x99\xff\xff\x00\xff\xff\x00\x00"
+    b"\x33\x99\x00\x33\x99\x00\x33\x99\x00\x33\x99\x00\x33\x99\xff\xff"
+    b"\x00\x00\x33\x99\x00\x33\x99\xff\xff\x00\x00\x33\x99\x00\x33\x99"
+    b"\x00\x33\x99\x00\x33\x99\xff\xff\x00\x00\x33\x99\x00\x33\x99\xff"
+    b"\xff\x00\x00\x33\x99\x00\x33\x99\x00\x33\x99\x00\x33\x99\x00\x33"
+    b"\x99\xff\xff\x00\xff\xff\x00\x00\x33\x99\x00\x33\x99\x00\x33\x99"
+)
+FLAG_PALETTES = (
+    b"\x00\x00\xff\x80\x80\x80\xff\x00\x00",
+    b"\x80\x80\x80\x00\x00\xff\xff\x00\x00\xff\xc8\x00",
+    b"\xff\x00\x00\x80\x80\x80\xff\x00\x00",
+    b"\x00\x00\xff\xff\x00\x00\x80\x80\x80",
+    b"\x00\x33\x99\xff\xff\x00\x00\x33\x99",
+)
+FLAG_SPARKS = (
+    b"\xc0\xc0\xff\x80\x80\x80\xff\xc0\xc0",
+    b"\xff\xff\xdc\xc0\xc0\xff\xff\xc0\xc0\xff\xdc\xa0",
+    b"\xff\xa0\xa0\xff\xff\xdc",
+    b"\xa0\xa0\xff\xff\xa0\xa0\xff\xff\xdc",
+    b"\xa0\xb4\xff\xff\xff\xa0",
+)
+
+# Brightness levels in percent and the bar length shown for each
+BRIGHTNESS_PERCENT = b"\x02\x05\x0a\x19\x32\x4b\x64"
+BAR_PIXELS = b"\x01\x02\x04\x08\x10\x18\x20"
+
+# Font: glyph i has columns GLYPH_DATA[GLYPH_STARTS[i]:GLYPH_STARTS[i + 1]] (bit r is row r)
+GLYPH_CHARS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ%-.: '
+GLYPH_DATA = (
+    b"\x06\x09\x06\x0a\x0f\x08\x0d\x0d\x0a\x09\x0b\x0f\x04\x06\x0f\x0b"
+    b"\x0b\x05\x0f\x0a\x0e\x01\x0d\x03\x0d\x0b\x0d\x07\x05\x0f\x0e\x05"
+    b"\x0e\x0f\x0b\x06\x06\x09\x09\x0f\x09\x06\x0f\x0b\x09\x0f\x05\x01"
+    b"\x06\x09\x0d\x0f\x02\x0f\x09\x0f\x09\x04\x08\x07\x0f\x06\x09\x0f"
+    b"\x08\x08\x0f\x02\x06\x0f\x0f\x02\x04\x0f\x0f\x09\x0f\x0f\x05\x07"
+    b"\x07\x0d\x0b\x0f\x05\x0a\x0b\x0b\x0d\x0d\x01\x0f\x01\x0f\x08\x0f"
+    b"\x07\x08\x07\x0f\x04\x06\x0f\x09\x06\x09\x03\x0c\x03\x0d\x09\x0b"
+    b"\x0d\x00\x0b\x02\x02\x02\x08\x0a\x00\x00"
+)
+GLYPH_STARTS = (
+    b"\x00\x03\x06\x09\x0c\x0f\x12\x15\x18\x1b\x1e\x21\x24\x27\x2a\x2d"
+    b"\x30\x33\x36\x39\x3c\x3f\x42\x46\x4a\x4d\x50\x53\x56\x5a\x5d\x60"
+    b"\x63\x67\x6a\x6d\x70\x73\x76\x77\x78\x7a"
+)
+GLYPH_SPACING = 1
@@ -0,0 +1,73 @@
+# Streaming audio levels from the I2S microphone
+# Blocks come from the capture ring without copying; RMS, peak and a smoothed envelope
+# are updated once per block so the modes can read them at frame rate
+import array
+import math
+
+FULL_SCALE = 32767
+FLOOR_DB = -60  # Quietest level shown, relative to full scale
+DB_PER_LN = 20 / math.log(10)
+
+class audio_levels:
+    # Envelope smoothing per block in 8.8 fixed point: fast attack, slow release
+    ATTACK = 160
+    RELEASE = 24
+    # Only every Nth sample is measured so a block fits in the frame budget on the RP2040
+    DECIMATE = 4
+    # Samples are squared at 12 bits so 256 measured samples sum without leaving small ints
+    SHIFT = 4
+
+    def __init__(self, source, block=1024):
+        self.source = source  # capture_ring, or None without a mic
+        self.samples = array.array('h', [0] * block)  # View of the last block once one arrives
+        self.count = 0  # Valid samples in the last block
+        self.rms = 0
+        self.peak = 0
+        self.envelope = 0
+        self.blocks = 0
+
+    def update(self, now=None):
+        """Measure the next captured block; returns False if none is ready"""
+        if self.source is None:
+            return False
+        samples = self.source.read()
+        if samples is None:
+            return False
+        n = len(samples)
+        self.samples = samples
+        self.count = n
+        shift = self.SHIFT
+        total = 0
+        peak = 0
+        for i in range(0, n, self.DECIMATE):
+            s = samples[i]
+            if s < 0:
+                s = -s
+            if s > peak:
+                peak = s
+            s >>= shift
+            total += s * s
+        measured = (n + self.DECIMATE - 1) // self.DECIMATE
+        rms = int(math.sqrt(total // measured)) << shift
+        self.rms = rms
+        self.peak = peak
+        env = self.envelope
+        if rms > env:
+            env += ((rms - env) * self.ATTACK) >> 8
+        elif env > rms:
+            # At least 1, or the step rounds to 0 just above rms and the envelope never gets there
+            env -= max(1, ((env - rms) * self.RELEASE) >> 8)
+        self.envelope = env
+        self.blocks += 1
+        return True
+
+    def level(self, value=None):
+        """A level (envelope by default) on a 0-256 dB scale from FLOOR_DB to full scale"""
+        if value is None:
+            value = self.envelope
+        if value <= 0:
+            return 0
+        db = DB_PER_LN * math.log(value / FULL_SCALE)
+        if db <= FLOOR_DB:
+            return 0
+        return min(256, int((db - FLOOR_DB) * 256 / -FLOOR_DB))
@@ -0,0 +1,167 @@
+# Beat tracking from the mic levels and a tempo-locked animation clock
+# The tracker looks for jumps in block loudness (energy flux), votes the gaps between
+# onsets into a BPM histogram and nudges the clock's phase onto each detected beat.
+# All history is kept in fixed-size arrays, so each block costs the same amount of work.
+import array
+
+class tempo_clock:
+    """Beat position that runs at the estimated tempo, in 8.8 fixed point beats"""
+    # Share of the phase error removed on each onset, in 8.8 fixed point
+    GAIN = 64
+    # Onsets further than this from a beat (in 1/256 beat) are off-beat hits and ignored,
+    # unless MAX_MISSES of them in a row show the clock itself is out of phase
+    WINDOW = 64
+    MAX_MISSES = 3
+
+    def __init__(self, bpm=120, now=0.0):
+        self.period = 60 / bpm  # Seconds per beat
+        self.anchor = now  # Time of anchor_pos
+        self.anchor_pos = 0
+        self.misses = 0
+
+    def bpm(self):
+        return 60 / self.period
+
+    def position(self, now):
+        """Beats since the clock started, in 8.8 fixed point (256 = one beat)"""
+        return self.anchor_pos + int((now - self.anchor) * 256 / self.period)
+
+    def set_tempo(self, bpm, now):
+        """Change speed without jumping: the position at now is kept"""
+        self.anchor_pos = self.position(now)
+        self.anchor = now
+        self.period = 60 / bpm
+
+    def sync(self, now):
+        """Pull the phase towards a beat that was just heard at now"""
+        pos = self.position(now)
+        frac = pos & 0xff
+        # Just after a beat means the clock runs ahead, just before means it lags
+        err = frac if frac < 128 else frac - 256
+        if -self.WINDOW <= err <= self.WINDOW:
+            self.misses = 0
+            correction = (err * self.GAIN) >> 8
+        else:
+            self.misses += 1
+            if self.misses < self.MAX_MISSES:
+                return
+            # Consistently off: jump straight onto the heard beats
+            self.misses = 0
+            correction = err
+        if correction > frac:
+            # Never step back past the beat that has already been shown
+            correction = frac
+        self.anchor_pos = pos - correction
+        self.anchor = now
+
+class beat_tracker:
+    # Flux history used for the adaptive onset threshold (~0.6 s at 50 blocks/s)
+    HISTORY = 32
+    # An onset needs this much more flux than the recent average, in 8.8 fixed point
+    THRESHOLD = 384
+    MIN_FLUX = 6  # On the 0-256 level scale: ignore tiny wobbles in silence
+    MIN_GAP = 0.25  # Seconds between onsets, so off-beat hits still count up to 240 BPM
+    # Tempo range the onset gaps are folded into: one octave, so gaps of one, two or
+    # four beats all vote for the same tempo instead of splitting between halves
+    MIN_BPM = 80
+    MAX_BPM = 159
+    ONSETS = 8  # Recent onset times kept for the interval votes
+    MAX_INTERVAL = 2.0  # Gaps longer than this are not compared
+    VOTE = 64
+    DECAY = 224  # Vote decay per onset, in 8.8 fixed point
+    MIN_VOTES = 160  # Votes the winning tempo needs before the clock follows it
+    LOCK_TIMEOUT = 3.0  # Seconds without onsets before the animation falls back to its timer
+
+    def __init__(self, audio, clock):
+        self.audio = audio
+        self.clock = clock
+        self.flux = array.array('H', [0] * self.HISTORY)
+        self.flux_idx = 0
+        self.flux_sum = 0
+        self.last_level = 0
+        self.onsets = [None] * self.ONSETS
+        self.onset_idx = 0
+        self.last_onset = None
+        self.votes = array.array('H', [0] * (self.MAX_BPM - self.MIN_BPM + 1))
+        self.best = 0  # Index of the winning tempo in votes
+        self.onset_count = 0
+
+    def update(self, now):
+        """Feed one new audio block; returns True when it contains an onset"""
+        level = self.audio.level(self.audio.rms)
+        flux = level - self.last_level
+        self.last_level = level
+        if flux < 0:
+            flux = 0
+
+        # Running mean over the fixed history ring
+        idx = self.flux_idx
+        self.flux_sum += flux - self.flux[idx]
+        self.flux[idx] = flux
+        self.flux_idx = (idx + 1) % self.HISTORY
+        mean = self.flux_sum // self.HISTORY
+
+        if flux < self.MIN_FLUX or (flux << 8) <= mean * self.THRESHOLD:
+            return False
+        if self.last_onset is not None and now - self.last_onset < self.MIN_GAP:
+            return False
+        self._onset(now)
+        return True
+
+    def _onset(self, now):
+        self.onset_count += 1
+        votes = self.votes
+        decay = self.DECAY
+        for i in range(len(votes)):
+            votes[i] = (votes[i] * decay) >> 8
+
+        # Every recent gap votes for the tempo it implies, folded into the BPM range
+        for t in self.onsets:
+            if t is None:
+                continue
+            interval = now - t
+            if interval <= 0 or interval > self.MAX_INTERVAL:
+                continue
+            bpm = 60 / interval
+            while bpm < self.MIN_BPM:
+                bpm *= 2
+            while bpm >= 2 * self.MIN_BPM:
+                bpm /= 2
+            i = int(bpm + 0.5) - self.MIN_BPM
+            if 0 <= i < len(votes):
+                votes[i] = min(65535, votes[i] + self.VOTE)
+                # Spread a little into the neighbours so near-equal gaps add up
+                if i > 0:
+                    votes[i - 1] = min(65535, votes[i - 1] + (self.VOTE >> 1))
+                if i + 1 < len(votes):
+                    votes[i + 1] = min(65535, votes[i + 1] + (self.VOTE >> 1))
+
+        best = 0
+        for i in range(1, len(votes)):
+            if votes[i] > votes[best]:
+                best = i
+        self.best = best
+
+        self.onsets[self.onset_idx] = now
+        self.onset_idx = (self.onset_idx + 1) % self.ONSETS
+        self.last_onset = now
+
+        clock = self.clock
+        if votes[best] >= self.MIN_VOTES:
+            # Ease towards the winning tempo instead of jumping to it
+            target = self.MIN_BPM + best
+            current = clock.bpm()
+            clock.set_tempo(current + (target - current) / 4, now)
+        clock.sync(now)
+
+    def bpm(self):
+        """Current tempo estimate, or None before enough onsets have been heard"""
+        if self.votes[self.best] < self.MIN_VOTES:
+            return None
+        return self.MIN_BPM + self.best
+
+    def locked(self, now):
+        """True while the music is steady enough to drive the animation"""
+        if self.last_onset is None or now - self.last_onset > self.LOCK_TIMEOUT:
+            return False
+        return self.votes[self.best] >= self.MIN_VOTES
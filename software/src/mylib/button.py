@@ -1,288 +1,189 @@
 # Button handling with press durations and visual progress bar feedback
-import time
-import math
-try:
-    import digitalio  # pyright: ignore[reportMissingImports]
-except ImportError:
-    digitalio = None
+# Presses arrive as timestamped events from an input backend: keypad scans and debounces
+# the pin in the background, or a digitalio pin is sampled on every update().
+# mylib.gestures turns them into the gestures light_show.on_gesture() acts on.
+from mylib.gestures import gesture_engine, DOWN
 
-class button_handler:
-    # Press duration thresholds (seconds)
-    SHORT_MAX = 0.5
-    MEDIUM_MAX = 1.5
-    LONG_MIN = 1.5
+class keypad_input:
+    """Button events from keypad.Keys, queued with their hardware timestamps
+    Edges are caught between updates, so a slow frame can't lose or stretch a press
+    """
+    # Events wait in the queue: update() only needs to run often enough for the feedback
+    POLL_PERIOD = 0.05
+    TICKS_MASK = (1 << 29) - 1  # supervisor.ticks_ms() wraps at 2**29
+
+    def __init__(self, pin, debounce=0.02):
+        import keypad  # pyright: ignore[reportMissingImports]
+        import supervisor  # pyright: ignore[reportMissingImports]
+        self.keypad = keypad
+        self.pin = pin
+        self.debounce = debounce
+        self.keys = None
+        self.claim()
+        self.event = keypad.Event()
+        self.ticks_ms = supervisor.ticks_ms
+        # The last event read by poll()
+        self.pressed = False
+        self.time = 0.0
+
+    def claim(self):
+        """Start scanning the pin (again, after release())
+        A fresh Keys assumes the key is up, so a press that woke the board arrives as an event
+        """
+        self.keys = self.keypad.Keys((self.pin,), value_when_pressed=False, pull=True,
+                                     interval=self.debounce, max_events=16)
+
+    def release(self):
+        """Stop scanning and free the pin, e.g. for a PinAlarm"""
+        self.keys.deinit()
+
+    def poll(self, now):
+        """Read the next queued event into pressed/time; False when there is none"""
+        if not self.keys.events.get_into(self.event):
+            return False
+        self.pressed = self.event.pressed
+        # Event age from its ticks_ms stamp, placed on the show's clock
+        age = (self.ticks_ms() - self.event.timestamp) & self.TICKS_MASK
+        self.time = now - age / 1000
+        return True
 
-    def __init__(self, button, show):
+class polled_input:
+    """Button events from sampling anything with a value (pulled up: False while pressed)
+    Edges are timestamped when sampled and debounced in software
+    """
+    POLL_PERIOD = 0.01
+
+    def __init__(self, button, debounce=0.02, pin=None):
+        """pin, if given, is what a PinAlarm watches while asleep (the stub button on the host)"""
         self.button = button
-        self.show = show
-        
-        # Interrupt-based state tracking
-        self.press_start_time = None
-        self.is_pressed = False
-        self.last_button_state = button.value if hasattr(button, 'value') else True
-        self.wake_mode = False  # Special mode for long-press wake-up
-        self.debounce_time = 0
-        # Save state before shutdown for wake-up restoration
-        self.saved_mode = 0
-        self.saved_set_idx = 0
-        
-        # Try to use keypad module for better interrupt-like behavior
-        self.use_keypad = False
-        try:
-            import keypad  # pyright: ignore[reportMissingImports]
-            # Check if button pin supports keypad
-            if hasattr(button, 'pin') or (hasattr(button, 'value') and hasattr(button, 'direction')):
-                # For now, we'll use efficient polling that behaves like interrupts
-                self.use_keypad = False  # Keep using digitalio for compatibility
-        except ImportError:
-            pass
+        self.debounce = debounce
+        self.pin = pin
+        self.last_value = button.value
+        self.last_edge = None
+        # The last event read by poll()
+        self.pressed = False
+        self.time = 0.0
+
+    def claim(self):
+        # Resync so a press that woke the board shows up as a new edge
+        self.last_value = True
+        self.last_edge = None
 
-    def _check_button_state(self):
-        """Check button state changes (interrupt-like behavior)"""
-        if not hasattr(self.button, 'value'):
+    def release(self):
+        pass
+
+    def poll(self, now):
+        """Sample the pin; True (with pressed/time set) on a debounced edge"""
+        value = self.button.value
+        if value == self.last_value:
             return False
-        
-        current_state = self.button.value
-        now = time.monotonic()
-        
-        # Debounce check
-        if now - self.debounce_time < 0.02:
+        if self.last_edge is not None and now - self.last_edge < self.debounce:
             return False
-        
-        # Detect falling edge (button press)
-        if not current_state and self.last_button_state and not self.is_pressed:
-            # Button just pressed
-            self.debounce_time = now
-            self.press_start_time = now
-            self.is_pressed = True
-            self.last_button_state = current_state
-            return True
-        
-        # Detect rising edge (button release)
-        if current_state and not self.last_button_state and self.is_pressed:
-            # Button just released
-            self.debounce_time = now
-            self.is_pressed = False
-            self.last_button_state = current_state
-            return True
-        
-        self.last_button_state = current_state
-        return False
+        self.last_value = value
+        self.last_edge = now
+        self.pressed = not value
+        self.time = now
+        return True
 
-    def _show_press_feedback(self, duration):
-        """Show visual progress bar feedback based on press duration"""
-        # Calculate progress through each stage
-        if duration < self.SHORT_MAX:
-            # Short press: blue progress bar
-            progress = duration / self.SHORT_MAX
-            color = (0, 0, 64)  # dim blue
-        elif duration < self.MEDIUM_MAX:
-            # Medium press: yellow progress bar
-            progress = (duration - self.SHORT_MAX) / (self.MEDIUM_MAX - self.SHORT_MAX)
-            color = (64, 64, 0)  # dim yellow
-        else:
-            # Long press: red bar fills immediately
-            progress = 1.0
-            color = (64, 0, 0)  # dim red
-            
-        # Calculate how many LEDs to light based on progress
-        num_pixels = len(self.show.pixel32)
-        lit_pixels = int(num_pixels * progress)
-        
-        # Fill the progress bar
-        for i in range(num_pixels):
-            if i < lit_pixels:
-                self.show.pixel32[i] = color
-            else:
-                self.show.pixel32[i] = (0, 0, 0)
-        self.show.pixel32.show()
-        
-        # Show current stage color on the single pixel
-        if self.show.pixel:
-            self.show.pixel[0] = color
-            self.show.pixel.show()
+class button_handler:
+    """Feeds button edges to the gesture engine, which publishes gestures to the show,
+    and draws the press progress bar while the button is down
+    """
+    DEBOUNCE = 0.02
+    # How often update() needs to run while a press is drawn (idle polling comes from the input)
+    FEEDBACK_PERIOD = 0.02
+    # Progress bar stages while on: (end of the stage in seconds, color); past the last, red
+    PRESS_STAGES = ((gesture_engine.SHORT_MAX, (0, 0, 64)),   # dim blue: short
+                    (gesture_engine.MEDIUM_MAX, (64, 64, 0)))  # dim yellow: medium
+    LONG_COLOR = (64, 0, 0)  # dim red: long
+    OFF_COLOR = (0, 0, 0)
+
+    def __init__(self, button, show, clock=None):
+        """button is an input backend (keypad_input) or anything with a value, which gets polled"""
+        self.button = button
+        self.show = show
+        self.clock = clock if clock is not None else show.clock
+        self.input = button if hasattr(button, 'poll') else polled_input(button, self.DEBOUNCE)
+        self.gestures = gesture_engine(show.on_gesture)
+        # What the progress bar and status pixel show now, so they're only redrawn on a change
+        self._lit = 0
+        self._color = self.OFF_COLOR
+
+    @property
+    def is_pressed(self):
+        return self.gestures.down_since is not None
 
-    def is_showing_feedback(self):
-        """Returns True if button feedback is currently being displayed"""
-        return (self.is_pressed and self.press_start_time is not None) or self.wake_mode
+    def next_deadline(self, now):
+        """When update() next needs to run: a gesture timeout, the next feedback frame or the next poll"""
+        deadline = now + (self.FEEDBACK_PERIOD if self.is_pressed else self.input.POLL_PERIOD)
+        timeout = self.gestures.deadline
+        if timeout is not None and timeout < deadline:
+            return timeout
+        return deadline
 
     def update(self):
-        """Update button state - call this from main loop (interrupt-driven)"""
-        # Don't check normal button state if we're in wake mode
-        if not self.wake_mode:
-            # Check for button state changes (interrupt-like detection)
-            state_changed = self._check_button_state()
-            
-            # If button was just released, handle it
-            if state_changed and not self.is_pressed and self.press_start_time is not None:
-                duration = time.monotonic() - self.press_start_time
-                
-                # Clear feedback
-                self.show.pixel32.fill((0, 0, 0))
-                self.show.pixel32.show()
-                if self.show.pixel:
-                    self.show.pixel[0] = (0, 0, 0)
-                    self.show.pixel.show()
-                
-                # Handle the press
-                self.handle_press(duration)
-                self.press_start_time = None
-                return
-        
-        # Update visual feedback if button is currently pressed (and not in wake mode)
-        if self.is_pressed and self.press_start_time is not None and not self.wake_mode:
-            duration = time.monotonic() - self.press_start_time
-            self._show_press_feedback(duration)
-        
-        # Handle wake mode (waiting for long press to wake up)
-        if self.wake_mode:
-            # Check for button state changes in wake mode using edge detection
-            if hasattr(self.button, 'value'):
-                current_state = self.button.value
-                now = time.monotonic()
-                
-                # Wake mode state machine: wait for release, then detect new press
-                if not self.is_pressed and self.press_start_time is None:
-                    # Not currently tracking a press
-                    state_changed = (self.last_button_state != current_state)
-                    
-                    if not current_state:
-                        # Button is currently pressed
-                        if state_changed and self.last_button_state:
-                            # Falling edge detected: button was released, now pressed - start wake timer
-                            if now - self.debounce_time >= 0.02:
-                                self.debounce_time = now
-                                self.press_start_time = now
-                                self.is_pressed = True
-                                self.last_button_state = current_state
-                        # Update state if it changed
-                        if state_changed:
-                            self.last_button_state = current_state
-                        return  # Button is pressed, wait for release
-                    else:
-                        # Button is currently released
-                        # Update state
-                        if state_changed:
-                            self.last_button_state = current_state
-                        # Button is released - continue to check for visual feedback
-                
-                # Update visual feedback while button is held in wake mode
-                if self.is_pressed and self.press_start_time is not None:
-                    held = time.monotonic() - self.press_start_time
-                    
-                    # Calculate wake progress (0 to 1.0)
-                    wake_progress = min(held / self.LONG_MIN, 1.0)
-                    
-                    # Map progress to colors (fade from dim blue to bright white)
-                    if wake_progress < 0.5:
-                        # First half: blue filling up
-                        intensity = int(32 * (wake_progress * 2))  # 0 to 32
-                        color = (0, 0, intensity)
-                    else:
-                        # Second half: add white to make it brighter
-                        white = int(64 * ((wake_progress - 0.5) * 2))  # 0 to 64
-                        color = (white, white, 64)  # keeps blue component bright
-                    
-                    # Update progress bar
-                    num_pixels = len(self.show.pixel32)
-                    lit_pixels = int(num_pixels * wake_progress)
-                    
-                    # Fill the bar
-                    for i in range(num_pixels):
-                        if i < lit_pixels:
-                            self.show.pixel32[i] = color
-                        else:
-                            self.show.pixel32[i] = (0, 0, 0)
-                    self.show.pixel32.show()
-                    
-                    # Update onboard pixel
-                    if self.show.pixel:
-                        self.show.pixel[0] = color if lit_pixels > 0 else (0, 0, 0)
-                        self.show.pixel.show()
-                
-                # Detect rising edge (button release) in wake mode
-                if current_state and not self.last_button_state and self.is_pressed and self.press_start_time is not None:
-                    # Button just released - check if it was held long enough
-                    if now - self.debounce_time >= 0.02:
-                        self.debounce_time = now
-                        held = time.monotonic() - self.press_start_time
-                        self.is_pressed = False
-                        
-                        # Clear feedback
-                        self.show.pixel32.fill((0, 0, 0))
-                        self.show.pixel32.show()
-                        if self.show.pixel:
-                            self.show.pixel[0] = (0, 0, 0)
-                            self.show.pixel.show()
-                        
-                        if held >= self.LONG_MIN:
-                            # Restore previous state
-                            self.show.active = True
-                            self.show.mode = self.saved_mode
-                            self.show.set_idx = self.saved_set_idx
-                            self.show.palette_pos = 0
-                            self.show.rotate_pos = 0
-                            print(f"Wake: mode {self.show.mode}, set {self.show.set_idx}")
-                            self.show.flash_feedback(0.12)
-                            self.show.last_palette_change = time.monotonic()
-                            self.wake_mode = False
-                        
-                        self.press_start_time = None
-                        self.last_button_state = current_state  # Update state after release handling
-                
-                # State is already updated in the state machine above
-                # No need for additional state updates here
+        """Feed every pending press and release to the gesture engine, then update the feedback
+        Durations come from the event times, not from when update() happened to run
+        """
+        now = self.clock.monotonic()
+        inp = self.input
+        gestures = self.gestures
+        while inp.poll(now):
+            if inp.pressed:
+                gestures.press(inp.time)
+            else:
+                # Clear the bar before the show reacts to the gesture
+                self._draw(0, self.OFF_COLOR)
+                gestures.release(inp.time)
+        gestures.advance(now)
+
+        # Only the first press of a gesture gets a bar; held time picks the stage
+        if gestures.state == DOWN:
+            held = now - gestures.down_since
+            if self.show.active:
+                self._press_feedback(held)
+            else:
+                self._wake_feedback(held)
+        else:
+            self._draw(0, self.OFF_COLOR)
 
-    def handle_press(self, duration):
-        """Handle a button press of the given duration"""
-        if duration < self.SHORT_MAX:
-            # short press: next set (palette)
-            old_set = self.show.set_idx
-            # Use sets_per_mode to determine the max sets for current mode
-            max_sets = self.show.sets_per_mode[self.show.mode]
-            self.show.set_idx = (self.show.set_idx + 1) % max_sets
-            self.show.palette_pos = 0
-            print(f"Set: {self.show.set_idx}")
-            
-            # Show set number (skip in brightness mode)
-            if self.show.mode != 3:  # Not in brightness mode
-                self.show.show_set_number(self.show.set_idx, color=(0, 0, 64))  # dim blue
-                # Show first color of new set
-                self.show.show_palette_color(self.show.sets[self.show.set_idx][0])
+    def _press_feedback(self, held):
+        """Bar filling through the current stage in the stage's color"""
+        start = 0.0
+        for end, color in self.PRESS_STAGES:
+            if held < end:
+                self._draw(int(len(self.show.progress.frame) * (held - start) / (end - start)), color)
+                return
+            start = end
+        # Long press: red bar fills immediately
+        self._draw(len(self.show.progress.frame), self.LONG_COLOR)
 
-        elif duration < self.MEDIUM_MAX:
-            # medium press: next mode
-            old_mode = self.show.mode
-            # Save current set for the old mode
-            self.show.mode_sets[old_mode] = self.show.set_idx
-            
-            # Switch to next mode
-            self.show.mode = (self.show.mode + 1) % self.show.mode_count
-            # Restore the saved set for the new mode
-            self.show.set_idx = self.show.mode_sets[self.show.mode]
-            self.show.palette_pos = 0
-            self.show.rotate_pos = 0
-            
-            print(f"Mode: {self.show.mode}, Set: {self.show.set_idx}")
-            # Show mode number on the grid
-            self.show.show_number(self.show.mode, color=(64, 64, 0))  # yellow number
-            # Show current set number for this mode (skip in brightness mode)
-            if self.show.mode != 3:  # Not in brightness mode
-                time.sleep(0.3)  # Brief pause between mode and set display
-                self.show.show_set_number(self.show.set_idx, color=(0, 0, 64))  # dim blue
-            self.show.last_palette_change = 0
+    def _wake_feedback(self, held):
+        """Wake progress bar while off: fills as the press approaches a long one"""
+        num_pixels = len(self.show.progress.frame)
+        lit = min(int(num_pixels * held / gesture_engine.MEDIUM_MAX), num_pixels)
+        # Fade from dim blue to bright white, in steps of one lit pixel
+        half = num_pixels // 2
+        if lit < half:
+            color = (0, 0, 32 * lit // half)
+        else:
+            white = 64 * (lit - half) // (num_pixels - half)
+            color = (white, white, 64)
+        self._draw(lit, color if lit else self.OFF_COLOR)
 
+    def _draw(self, lit, color):
+        """Show lit pixels of the progress bar, if that's not what is already up"""
+        if lit == self._lit and color == self._color:
+            return
+        self._lit = lit
+        self._color = color
+        show = self.show
+        if lit:
+            frame = show.progress.frame
+            frame.clear()
+            frame.span(0, lit, color)
+            show.progress.show()
         else:
-            # long press: toggle active state
-            # Save current state before shutting down
-            self.saved_mode = self.show.mode
-            self.saved_set_idx = self.show.set_idx
-            self.show.active = False
-            print("Off")
-            self.show.show_off()
-            self.wake_mode = True
-            self.press_start_time = None
-            # Reset button state tracking to ensure clean wake detection
-            self.is_pressed = False
-            if hasattr(self.button, 'value'):
-                self.last_button_state = self.button.value
\ No newline at end of file
+            show.progress.hide()
+        # Current stage color on the single pixel
+        show.show_status_color(color)
@@ -0,0 +1,88 @@
+# Double-buffered audio capture: a preallocated ring of sample blocks
+# The capture task reads the mic into the next free block; consumers get a memoryview
+# of a finished block, so samples are never copied after the mic writes them.
+import array
+
+class last_read_reader:
+    """readinto() for pio_i2s, which records in the background and only offers
+    last_read, the newest completed buffer"""
+
+    def __init__(self, mic):
+        self.mic = mic
+        self.last = None
+
+    def readinto(self, view):
+        data = self.mic.last_read
+        # rp2pio empties last_read once it has been read; a driver that hands back the
+        # same buffer again has nothing new either, so the block isn't captured twice
+        if not len(data) or data is self.last:
+            return 0
+        self.last = data
+        n = len(data)
+        if n >= len(view):
+            n = len(view)
+            view[:] = memoryview(data)[:n]
+        else:
+            view[:n] = data
+        return n
+
+def mic_reader(mic):
+    """The mic itself if it has readinto(), else a last_read_reader for it"""
+    return mic if hasattr(mic, 'readinto') else last_read_reader(mic)
+
+class capture_ring:
+    def __init__(self, mic, block=1024, blocks=4, sample_rate=48000):
+        self.mic = mic_reader(mic) if mic is not None else None
+        self.block = block
+        self.blocks = blocks
+        self.sample_rate = getattr(mic, "sample_rate", sample_rate)
+        self.buf = array.array('h', [0] * (block * blocks))
+        mv = memoryview(self.buf)
+        self.views = [mv[i * block:(i + 1) * block] for i in range(blocks)]
+        # What consumers get: read-only where the port supports it (CPython host runs)
+        self.out_views = [v.toreadonly() if hasattr(v, 'toreadonly') else v for v in self.views]
+        self.counts = array.array('H', [0] * blocks)  # Valid samples in each block
+        self.head = 0  # Next block to capture into
+        self.tail = 0  # Oldest finished block
+        self.filled = 0
+        self.captured = 0
+        self.overruns = 0  # Blocks dropped because the consumers fell behind
+        self.underruns = 0  # Captures that found the mic with nothing (or too little) ready
+
+    def block_period(self):
+        """Seconds of audio in one block - the capture task's period"""
+        return self.block / self.sample_rate
+
+    def capture(self, now=None):
+        """Read one block from the mic into the ring; returns the number of samples"""
+        if self.mic is None:
+            return 0
+        if self.filled == self.blocks:
+            # Nobody consumed the oldest block in time: drop it to make room
+            self.tail = (self.tail + 1) % self.blocks
+            self.filled -= 1
+            self.overruns += 1
+        head = self.head
+        n = self.mic.readinto(self.views[head])
+        if n < self.block:
+            self.underruns += 1
+        if not n:
+            return 0
+        self.counts[head] = n
+        self.head = (head + 1) % self.blocks
+        self.filled += 1
+        self.captured += 1
+        return n
+
+    def read(self):
+        """The oldest finished block as a memoryview (consumed), or None if none is ready
+        The view stays valid until the capture wraps around the ring
+        """
+        if not self.filled:
+            return None
+        tail = self.tail
+        self.tail = (tail + 1) % self.blocks
+        self.filled -= 1
+        view = self.out_views[tail]
+        n = self.counts[tail]
+        return view if n == self.block else view[:n]
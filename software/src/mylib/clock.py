@@ -0,0 +1,27 @@
+# Time sources for the show, button handler and scheduler
+# system_clock is the real thing; virtual_clock only moves when slept or advanced,
+# so the host can run hours of animation or thousands of presses in seconds
+import time
+
+class system_clock:
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+class virtual_clock:
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """Returns at once, with the clock moved on by seconds"""
+        if seconds > 0:
+            self.now += seconds
+
+    def advance(self, seconds):
+        self.now += seconds
@@ -0,0 +1,36 @@
+# 8.8 fixed-point color math: integer blends, fades and saturating adds
+# Floats are software-emulated on the RP2040 and allocate, so the animation
+# code works with integer weights where 256 means 1.0
+
+ONE = 256  # 1.0 in 8.8 fixed point
+
+def to_fixed(x):
+    """Convert a float weight (0.0-1.0+) to 8.8 fixed point"""
+    return int(x * ONE + 0.5)
+
+def lerp8(a, b, t):
+    """Blend two channel values, t=0 gives a and t=256 gives b"""
+    return (a * (ONE - t) + b * t) >> 8
+
+def scale8(v, s):
+    """Scale a channel value by s/256, saturating at 255"""
+    v = (v * s) >> 8
+    return 255 if v > 255 else v
+
+def qadd8(a, b):
+    """Saturating add of two channel values"""
+    v = a + b
+    return 255 if v > 255 else v
+
+def lerp_color(c1, c2, t):
+    return (
+        (c1[0] * (ONE - t) + c2[0] * t) >> 8,
+        (c1[1] * (ONE - t) + c2[1] * t) >> 8,
+        (c1[2] * (ONE - t) + c2[2] * t) >> 8
+    )
+
+def scale_color(c, s):
+    return (scale8(c[0], s), scale8(c[1], s), scale8(c[2], s))
+
+def add_color(c1, c2):
+    return (qadd8(c1[0], c2[0]), qadd8(c1[1], c2[1]), qadd8(c1[2], c2[2]))
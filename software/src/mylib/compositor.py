@@ -0,0 +1,72 @@
+# Layer stack flattened once per frame: base animation, overlays, button progress
+from mylib.framebuffer import framebuffer
+
+class layer:
+    def __init__(self, n, alpha=256, keyed=False):
+        self.frame = framebuffer(n)
+        self.alpha = alpha  # 8.8 fixed point, 256 = opaque
+        self.keyed = keyed  # Black pixels are transparent (mask taken from the content)
+        self.visible = False
+        self.dirty = False  # Changed since the last flatten
+
+    def show(self):
+        self.visible = True
+        self.dirty = True
+
+    def hide(self):
+        if self.visible:
+            self.visible = False
+            self.dirty = True
+
+class compositor:
+    def __init__(self, n):
+        self.out = framebuffer(n)
+        self.layers = []
+
+    def add(self, alpha=256, keyed=False, visible=False):
+        """Add a layer on top of the stack"""
+        l = layer(len(self.out), alpha, keyed)
+        l.visible = visible
+        self.layers.append(l)
+        return l
+
+    def dirty(self):
+        for l in self.layers:
+            if l.dirty:
+                return True
+        return False
+
+    def flatten(self):
+        """Blend every visible layer, bottom to top, into the output frame"""
+        out = self.out
+        first = True
+        for l in self.layers:
+            l.dirty = False
+            if not l.visible:
+                continue
+            if first or (l.alpha >= 256 and not l.keyed):
+                # Opaque layer: plain copy, no per-pixel work
+                out.blit(l.frame.buf)
+            else:
+                self._blend(out.buf, l.frame.buf, l.alpha, l.keyed)
+            first = False
+        if first:
+            out.clear()
+        return out
+
+    def _blend(self, dst, src, alpha, keyed):
+        inv = 256 - alpha
+        for i in range(0, len(dst), 3):
+            r = src[i]
+            g = src[i + 1]
+            b = src[i + 2]
+            if keyed and not (r or g or b):
+                continue
+            if alpha >= 256:
+                dst[i] = r
+                dst[i + 1] = g
+                dst[i + 2] = b
+            else:
+                dst[i] = (dst[i] * inv + r * alpha) >> 8
+                dst[i + 1] = (dst[i + 1] * inv + g * alpha) >> 8
+                dst[i + 2] = (dst[i + 2] * inv + b * alpha) >> 8
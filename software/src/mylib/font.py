@@ -0,0 +1,69 @@
+# Packed 4-row bitmap font and text rendering for the 4x8 grid
+# The glyphs come from the compiled assets (software/assets/patterns.json): one byte per
+# column, bit r of a column is row r (row 0 at the top), 1-4 columns per glyph, all in
+# one bytes constant.
+from mylib.assets import GLYPH_CHARS, GLYPH_DATA, GLYPH_STARTS, GLYPH_SPACING
+
+SPACING = GLYPH_SPACING  # Blank columns between glyphs
+
+def glyph_index(ch):
+    """Index of a character's glyph; unknown characters draw as a space"""
+    i = GLYPH_CHARS.find(ch.upper())
+    return i if i >= 0 else GLYPH_CHARS.find(" ")
+
+def text_width(text):
+    """Width of a string in columns, including the gaps between glyphs"""
+    width = 0
+    for ch in text:
+        i = glyph_index(ch)
+        width += GLYPH_STARTS[i + 1] - GLYPH_STARTS[i] + SPACING
+    return width - SPACING if width else 0
+
+def draw_text(frame, text, color, x=0):
+    """Draw text with its left edge at column x (may be negative); columns off the grid are clipped"""
+    r, g, b = color
+    width = frame.width
+    height = frame.height
+    for ch in text:
+        i = glyph_index(ch)
+        for col in range(GLYPH_STARTS[i], GLYPH_STARTS[i + 1]):
+            bits = GLYPH_DATA[col]
+            if 0 <= x < width:
+                idx = x
+                for row in range(height):
+                    if bits >> row & 1:
+                        frame.set_rgb(idx, r, g, b)
+                    idx += width
+            x += 1
+        x += SPACING
+        if x >= width:
+            break
+
+class scroller:
+    """Horizontally scrolls text wider than the grid, one column per step"""
+
+    def __init__(self, text, color, width=8):
+        self.text = text
+        self.color = color
+        self.text_width = text_width(text)
+        # Text that fits is shown still; wider text enters from the right (its first column
+        # already on the grid) and leaves on the left
+        self.scrolls = self.text_width > width
+        self.start_x = width - 1 if self.scrolls else 0
+        self.x = self.start_x
+        self.end = -self.text_width
+
+    def done(self):
+        return self.scrolls and self.x <= self.end
+
+    def step(self):
+        if self.scrolls and self.x > self.end:
+            self.x -= 1
+
+    def seek(self, steps):
+        """Jump to the position after a number of steps from the start"""
+        if self.scrolls:
+            self.x = max(self.end, self.start_x - steps)
+
+    def render(self, frame):
+        draw_text(frame, self.text, self.color, self.x)
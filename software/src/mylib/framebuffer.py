@@ -0,0 +1,82 @@
+# Preallocated RGB framebuffer pushed to the NeoPixels in one bulk copy
+
+class framebuffer:
+    """Compact RGB frame stored as 3 bytes per pixel in a preallocated bytearray
+    Layout matches the FeatherWing: row * width + col
+    """
+
+    def __init__(self, n, width=8):
+        self.n = n
+        self.width = width
+        self.height = n // width
+        self.buf = bytearray(n * 3)
+        self.mv = memoryview(self.buf)
+        self._blank = bytes(n * 3)
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, idx, color):
+        i = idx * 3
+        buf = self.buf
+        buf[i] = color[0]
+        buf[i + 1] = color[1]
+        buf[i + 2] = color[2]
+
+    def __getitem__(self, idx):
+        i = idx * 3
+        buf = self.buf
+        return (buf[i], buf[i + 1], buf[i + 2])
+
+    def set_rgb(self, idx, r, g, b):
+        """Write one pixel without building a color tuple"""
+        i = idx * 3
+        buf = self.buf
+        buf[i] = r
+        buf[i + 1] = g
+        buf[i + 2] = b
+
+    def clear(self):
+        self.mv[:] = self._blank
+
+    def fill(self, color):
+        if color[0] == 0 and color[1] == 0 and color[2] == 0:
+            self.clear()
+        else:
+            self.span(0, self.n, color)
+
+    def span(self, start, count, color):
+        """Fill count consecutive pixels from start"""
+        if count <= 0:
+            return
+        i = start * 3
+        end = i + count * 3
+        buf = self.buf
+        buf[i] = color[0]
+        buf[i + 1] = color[1]
+        buf[i + 2] = color[2]
+        # Double the filled region with memoryview copies instead of per-pixel writes
+        mv = self.mv
+        done = 3
+        while i + done < end:
+            step = min(done, end - i - done)
+            mv[i + done:i + done + step] = mv[i:i + step]
+            done += step
+
+    def row(self, row, color):
+        self.span(row * self.width, self.width, color)
+
+    def rect(self, col, row, w, h, color):
+        for r in range(row, row + h):
+            self.span(r * self.width + col, w, color)
+
+    def blit(self, frame):
+        """Copy a whole frame (bytes of the same size) into the buffer"""
+        self.mv[:] = frame
+
+    def snapshot(self):
+        return bytes(self.buf)
+
+    def push(self, pixels):
+        """Bulk copy into a NeoPixel (or pixel_stub) buffer"""
+        pixels[:] = self.buf
@@ -0,0 +1,43 @@
+# Garbage collection in the main loop's idle time
+# Once the heap has grown by THRESHOLD bytes since the last collection, the collector
+# runs from the scheduler's idle hook, and only when the next deadline is at least
+# MIN_IDLE seconds away - so the pause lands between frames instead of mid-render.
+import gc
+from mylib.perf import ticks_us, ticks_diff
+
+class gc_policy:
+    THRESHOLD = 8192  # Bytes allocated since the last collection before one is worth it
+    MIN_IDLE = 0.006  # Seconds before the next deadline a collection needs (RP2040: ~2-4 ms)
+    BACKSTOP = 4  # Automatic collection still kicks in after this many THRESHOLDs
+
+    def __init__(self, hist=None):
+        """hist, when given, is a perf histogram the collection pauses are added to (us)"""
+        self.hist = hist
+        self.collections = 0
+        # CPython has no mem_alloc and its own collector: leave it alone there
+        self.enabled = hasattr(gc, "mem_alloc")
+        self.last = 0
+        if self.enabled:
+            if hasattr(gc, "threshold"):
+                # Keep the allocator's own collection for when idle time never comes
+                gc.threshold(self.THRESHOLD * self.BACKSTOP)
+            gc.collect()
+            self.last = gc.mem_alloc()
+
+    def idle(self, now, deadline):
+        """Scheduler idle hook: collect if it's due and fits before deadline"""
+        if not self.enabled or deadline - now < self.MIN_IDLE:
+            return
+        allocated = gc.mem_alloc()
+        if allocated < self.last:
+            # The allocator collected on its own since
+            self.last = allocated
+            return
+        if allocated - self.last < self.THRESHOLD:
+            return
+        start = ticks_us()
+        gc.collect()
+        if self.hist is not None:
+            self.hist.add(ticks_diff(ticks_us(), start))
+        self.collections += 1
+        self.last = gc.mem_alloc()
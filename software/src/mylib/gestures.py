@@ -0,0 +1,109 @@
+# Button gestures from press and release times, driven by one transition table
+# The inputs are the edges (a release is classified by how long the button was down)
+# and the timeout each state arms. A transition can publish one gesture to the listener.
+# A short press is only published once DOUBLE_GAP has passed without a second press.
+
+# Gestures published as listener(gesture, value)
+SHORT = 1     # value: press duration
+MEDIUM = 2    # value: press duration
+LONG = 3      # value: press duration
+DOUBLE = 4    # Two short presses; value: second press duration
+HOLD = 5      # Click, then press and hold: repeats every REPEAT_PERIOD; value: repeat count
+HOLD_END = 6  # The held press was released; value: repeat count
+NAMES = ("none", "short", "medium", "long", "double", "hold", "hold end")
+
+# States
+IDLE = 0
+DOWN = 1    # First press held
+GAP = 2     # Short press released: waiting to see if a second one follows
+SECOND = 3  # Second press held
+REPEAT = 4  # Second press held past SHORT_MAX
+
+# Inputs
+PRESS = 0
+RELEASE_SHORT = 1
+RELEASE_MEDIUM = 2
+RELEASE_LONG = 3
+TIMEOUT = 4
+
+# (state, input) -> (next state, gesture or None); pairs not listed are ignored
+TRANSITIONS = {
+    (IDLE, PRESS): (DOWN, None),
+    (DOWN, RELEASE_SHORT): (GAP, None),
+    (DOWN, RELEASE_MEDIUM): (IDLE, MEDIUM),
+    (DOWN, RELEASE_LONG): (IDLE, LONG),
+    (GAP, PRESS): (SECOND, None),
+    (GAP, TIMEOUT): (IDLE, SHORT),
+    (SECOND, RELEASE_SHORT): (IDLE, DOUBLE),
+    (SECOND, TIMEOUT): (REPEAT, HOLD),
+    (REPEAT, TIMEOUT): (REPEAT, HOLD),
+    (REPEAT, RELEASE_SHORT): (IDLE, HOLD_END),
+    (REPEAT, RELEASE_MEDIUM): (IDLE, HOLD_END),
+    (REPEAT, RELEASE_LONG): (IDLE, HOLD_END),
+}
+
+class gesture_engine:
+    # Press duration thresholds (seconds)
+    SHORT_MAX = 0.5
+    MEDIUM_MAX = 1.5
+    DOUBLE_GAP = 0.25  # Longest wait after a short press for the second click
+    REPEAT_PERIOD = 0.3
+
+    def __init__(self, listener):
+        self.listener = listener
+        # Timeout armed on entering each state
+        self.timeouts = {GAP: self.DOUBLE_GAP, SECOND: self.SHORT_MAX, REPEAT: self.REPEAT_PERIOD}
+        self.state = IDLE
+        self.deadline = None  # When the current state's timeout fires
+        self.down_since = None  # Start of the press in progress
+        self.last_duration = 0  # Of the last release: a SHORT published on timeout reports it
+        self.repeats = 0
+
+    def idle(self):
+        return self.state == IDLE
+
+    def press(self, t):
+        self.advance(t)
+        self.down_since = t
+        self._step(PRESS, t, 0)
+
+    def release(self, t):
+        if self.down_since is None:
+            return
+        self.advance(t)
+        duration = t - self.down_since
+        self.down_since = None
+        self.last_duration = duration
+        if duration < self.SHORT_MAX:
+            inp = RELEASE_SHORT
+        elif duration < self.MEDIUM_MAX:
+            inp = RELEASE_MEDIUM
+        else:
+            inp = RELEASE_LONG
+        self._step(inp, t, duration)
+
+    def advance(self, now):
+        """Fire every timeout due by now, in order"""
+        while self.deadline is not None and self.deadline <= now:
+            self._step(TIMEOUT, self.deadline, self.last_duration)
+
+    def _step(self, inp, t, duration):
+        entry = TRANSITIONS.get((self.state, inp))
+        if entry is None:
+            return
+        state, gesture = entry
+        if state != self.state or inp == TIMEOUT:
+            timeout = self.timeouts.get(state)
+            self.deadline = t + timeout if timeout is not None else None
+        if state == REPEAT and self.state != REPEAT:
+            self.repeats = 0
+        self.state = state
+        if gesture is None:
+            return
+        if gesture == HOLD:
+            self.repeats += 1
+            self.listener(gesture, self.repeats)
+        elif gesture == HOLD_END:
+            self.listener(gesture, self.repeats)
+        else:
+            self.listener(gesture, duration)
@@ -1,8 +1,16 @@
 # Hardware initialization and stubs
+import struct
 import time
-import board # pyright: ignore[reportMissingImports]
-import digitalio # pyright: ignore[reportMissingImports]
-import neopixel # pyright: ignore[reportMissingImports]
+from mylib.button import keypad_input
+from mylib.settings import fletcher16
+from mylib.capture import mic_reader
+try:
+    import board # pyright: ignore[reportMissingImports]
+    import digitalio # pyright: ignore[reportMissingImports]
+    import neopixel # pyright: ignore[reportMissingImports]
+except ImportError:
+    # Host runs (simulator, benchmarks) use the stubs below
+    board = None
 
 # Track if we have real hardware or are using stubs
 have_hardware = False
@@ -22,7 +30,15 @@ class pixel_stub:
     def show(self):
         pass
     def __setitem__(self, idx, val):
-        if 0 <= idx < self._n:
+        if isinstance(idx, slice):
+            # Bulk write, like NeoPixel slice assignment
+            indices = range(*idx.indices(self._n))
+            if len(val) == len(indices) * 3:
+                # Flattened r, g, b values (e.g. a framebuffer bytearray)
+                val = [tuple(val[i:i + 3]) for i in range(0, len(val), 3)]
+            for i, v in zip(indices, val):
+                self.data[i] = v
+        elif 0 <= idx < self._n:
             self.data[idx] = val
     def __len__(self):
         return self._n
@@ -31,43 +47,316 @@ class button_stub:
     def __init__(self):
         self.value = True
 
-def init_hardware():
-    """Initialize all hardware with fallbacks"""
-    led = None
-    button = None
-    pixel = None
-    pixel32 = None
-    mic = None
-    
+class mic_stub:
+    """Plays back signed 16-bit samples (looped) in place of the I2S mic
+    Pass a list of samples, or wav_path for a 16-bit WAV file (first channel used)
+    """
+    def __init__(self, samples=None, sample_rate=48000, wav_path=None):
+        if wav_path is not None:
+            samples, sample_rate = read_wav(wav_path)
+        self.samples = samples if samples else [0]
+        self.sample_rate = sample_rate
+        self.pos = 0
+    def readinto(self, buf):
+        src = self.samples
+        n = len(src)
+        pos = self.pos
+        for i in range(len(buf)):
+            buf[i] = src[pos]
+            pos += 1
+            if pos == n:
+                pos = 0
+        self.pos = pos
+        return len(buf)
+
+class pin_alarm_stub:
+    def __init__(self, pin, value=False, edge=False, pull=False):
+        self.pin = pin
+        self.value = value
+
+class time_alarm_stub:
+    def __init__(self, monotonic_time=None, epoch_time=None):
+        self.monotonic_time = monotonic_time
+
+class alarm_stub:
+    """Stands in for the alarm module: light sleep passes time on the given clock until an
+    alarm fires. A pin alarm watches anything with a value (e.g. a button stub) as its pin.
+    timeout ends a sleep nothing would wake (returns None), so host runs can finish.
+    """
+    class pin:
+        PinAlarm = pin_alarm_stub
+
+    class time:
+        TimeAlarm = time_alarm_stub
+
+    def __init__(self, clock, step=0.01, timeout=None):
+        self.clock = clock
+        self.step = step
+        self.timeout = timeout
+        self.wake_alarm = None
+        self.sleeps = 0
+
+    def light_sleep_until_alarms(self, *alarms):
+        self.sleeps += 1
+        start = self.clock.monotonic()
+        while True:
+            now = self.clock.monotonic()
+            for a in alarms:
+                if isinstance(a, pin_alarm_stub) and a.pin.value == a.value:
+                    self.wake_alarm = a
+                    return a
+                if isinstance(a, time_alarm_stub) and now >= a.monotonic_time:
+                    self.wake_alarm = a
+                    return a
+            if self.timeout is not None and now - start >= self.timeout:
+                return None
+            self.clock.sleep(self.step)
+
+class nvm_stub:
+    """bytearray-backed stand-in for microcontroller.nvm (erased flash reads 0xff)
+    Pass path to keep the contents in a file between host runs
+    """
+    def __init__(self, size=4096, path=None):
+        self.path = path
+        self.data = bytearray(b"\xff" * size)
+        self.writes = 0
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    saved = f.read(size)
+                self.data[:len(saved)] = saved
+            except OSError:
+                pass
+    def __len__(self):
+        return len(self.data)
+    def __getitem__(self, idx):
+        return self.data[idx]
+    def __setitem__(self, idx, val):
+        self.data[idx] = val
+        self.writes += 1
+        if self.path is not None:
+            with open(self.path, "wb") as f:
+                f.write(self.data)
+
+def init_nvm():
+    """microcontroller.nvm for saved settings, or None where there is none"""
     try:
-        # CircuitPython boards have these by default
-        global have_hardware
-        have_hardware = True
-        print("o Successfully imported hardware libraries")
-    except ImportError as e:
-        print(f"o Import error: {e}")
-        print("o Failed to import hardware libraries - running in stub mode")
-        return led_stub(), button_stub(), pixel_stub(1), pixel_stub(32), None
-    
-    # LED init
+        import microcontroller  # pyright: ignore[reportMissingImports]
+        return microcontroller.nvm
+    except (ImportError, AttributeError):
+        return None
+
+def init_alarm():
+    """The alarm module for light sleep, or None where there is none"""
     try:
-        led = digitalio.DigitalInOut(board.LED)
-        led.direction = digitalio.Direction.OUTPUT
-    except Exception:
-        led = led_stub()
+        import alarm  # pyright: ignore[reportMissingImports]
+        return alarm
+    except ImportError:
+        return None
 
-    # Single NeoPixel
+def read_wav(path):
+    """Samples and sample rate of a 16-bit PCM WAV file (host testing only)"""
+    import array
+    import wave
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError("%s: only 16-bit WAV files are supported" % path)
+        channels = w.getnchannels()
+        samples = array.array('h', w.readframes(w.getnframes()))
+        rate = w.getframerate()
+    if channels > 1:
+        samples = samples[::channels]
+    return samples, rate
+
+class boot_timer:
+    """Milliseconds spent on each boot step
+    Uses supervisor.ticks_ms() (counting from power-on) on the board, so at() is time since power-on
+    """
+    def __init__(self):
+        try:
+            import supervisor  # pyright: ignore[reportMissingImports]
+            self.ticks_ms = supervisor.ticks_ms
+        except ImportError:
+            start = time.monotonic()
+            self.ticks_ms = lambda: int((time.monotonic() - start) * 1000)
+        self.steps = []
+        self.start = self.last = self.ticks_ms()  # After the imports that got us here
+
+    def at(self):
+        return self.ticks_ms()
+
+    def mark(self, name):
+        """Record the time since the previous mark as step name"""
+        now = self.ticks_ms()
+        self.steps.append((name, now - self.last))
+        self.last = now
+
+    def report(self):
+        print("o boot: started at %d ms; %s; %d ms since power-on" % (
+            self.start, ", ".join("%s %d ms" % step for step in self.steps), self.at()))
+
+class lazy_mic:
+    """Opens the I2S mic on the first read, so boot doesn't wait for it
+    (and the mic stays off until a mode that listens is shown)
+    """
+    def __init__(self, open_mic, sample_rate=48000):
+        self.open_mic = open_mic
+        self.sample_rate = sample_rate
+        self.mic = None
+        self.failed = False
+
+    def readinto(self, buf):
+        mic = self.mic
+        if mic is None:
+            if self.failed:
+                return 0
+            try:
+                mic = self.mic = mic_reader(self.open_mic())
+                print("o Microphone initialized")
+            except Exception as e:
+                print("o Microphone init failed:", e)
+                self.failed = True
+                return 0
+        return mic.readinto(buf)
+
+def open_mic():
+    import pio_i2s  # pyright: ignore[reportMissingImports]
+    return pio_i2s.I2S(
+        data_in=getattr(board, 'D10', None),
+        bit_clock=getattr(board, 'D11', None),
+        channel_count=1,
+        sample_rate=48000,
+        bits_per_sample=16,
+        samples_signed=True,
+        buffer_size=4096,
+        peripheral=False,
+    )
+
+# Pins tried for the FeatherWing and the button, in order; the profile stores indexes into these
+FEATHERWING_PINS = ('D6', 'D5', 'D9', 'D10')
+BUTTON_PINS = ('BUTTON', 'D9', 'D5', 'SW1', 'BTN', 'BOOT')
+NO_PIN = 0xff
+
+class hardware_profile:
+    """The pins found by the last probe, cached in NVM so later boots skip probing
+    Record: magic, version, board id checksum, FeatherWing pin, button pin, checksum
+    """
+    MAGIC = 0x48  # 'H'
+    VERSION = 1
+    OFFSET = 512  # Past the settings slots
+    FORMAT = "<BBHBB"
+    SIZE = 8
+
+    def __init__(self, nvm):
+        self.nvm = nvm
+        board_id = getattr(board, 'board_id', '').encode()
+        self.board_hash = fletcher16(board_id, len(board_id))
+        self.featherwing = NO_PIN
+        self.button = NO_PIN
+
+    def load(self):
+        """True if NVM holds a valid profile for this board"""
+        if self.nvm is None or len(self.nvm) < self.OFFSET + self.SIZE:
+            return False
+        record = self.nvm[self.OFFSET:self.OFFSET + self.SIZE]
+        magic, version, board_hash, featherwing, button = struct.unpack_from(self.FORMAT, record, 0)
+        checksum = record[6] | (record[7] << 8)
+        if (magic != self.MAGIC or version != self.VERSION or board_hash != self.board_hash
+                or fletcher16(record, 6) != checksum):
+            return False
+        self.featherwing = featherwing
+        self.button = button
+        return True
+
+    def save(self):
+        """Write the profile if NVM doesn't already hold it"""
+        if self.nvm is None or len(self.nvm) < self.OFFSET + self.SIZE:
+            return
+        record = bytearray(self.SIZE)
+        struct.pack_into(self.FORMAT, record, 0, self.MAGIC, self.VERSION, self.board_hash,
+                         self.featherwing, self.button)
+        struct.pack_into("<H", record, 6, fletcher16(record, 6))
+        if self.nvm[self.OFFSET:self.OFFSET + self.SIZE] != record:
+            self.nvm[self.OFFSET:self.OFFSET + self.SIZE] = record
+            print("o Hardware profile saved")
+
+def init_featherwing(profile):
+    """The 32-LED FeatherWing strip on the profiled pin, or the first pin that takes it"""
+    # Both NeoPixel outputs run at full driver brightness; light_show's output stage scales them
+    if profile.featherwing != NO_PIN:
+        pin = getattr(board, FEATHERWING_PINS[profile.featherwing], None)
+        if pin is not None:
+            try:
+                pixels = neopixel.NeoPixel(pin, 32, brightness=1.0, auto_write=False)
+                print("o FeatherWing initialized on", pin, "(cached)")
+                return pixels
+            except Exception as e:
+                print("o FeatherWing init on the profiled pin failed:", e)
+    for idx, pin_name in enumerate(FEATHERWING_PINS):
+        pin = getattr(board, pin_name, None)
+        if pin is None:
+            continue
+        try:
+            pixels = neopixel.NeoPixel(pin, 32, brightness=1.0, auto_write=False)
+        except Exception:
+            continue
+        profile.featherwing = idx
+        print("o FeatherWing initialized on", pin)
+        return pixels
+    print("o No valid FeatherWing pin found")
+    profile.featherwing = NO_PIN
+    return pixel_stub(32)
+
+def find_button_pin(profile):
+    if profile.button != NO_PIN:
+        pin = getattr(board, BUTTON_PINS[profile.button], None)
+        if pin is not None:
+            return pin
+    for idx, name in enumerate(BUTTON_PINS):
+        pin = getattr(board, name, None)
+        if pin is not None:
+            profile.button = idx
+            return pin
+    profile.button = NO_PIN
+    return None
+
+def init_button(pin):
+    """keypad debounces and timestamps presses in the background; digitalio gets polled"""
+    if pin is None:
+        print("o No button pin found")
+        return button_stub()
     try:
-        np_pin = getattr(board, "NEOPIXEL", None)
-        if np_pin is not None:
-            pixel = neopixel.NeoPixel(np_pin, 1, brightness=0.01, auto_write=False)
-            print("Single NeoPixel initialized on", np_pin)
-        else:
-            print("No NEOPIXEL pin found")
-            pixel = pixel_stub(1)
+        button = keypad_input(pin)
+        print("o Button initialized on", pin, "(keypad)")
+        return button
     except Exception as e:
-        print("NeoPixel init failed:", e)
-        pixel = pixel_stub(1)
+        print("o keypad unavailable, polling the button:", e)
+    try:
+        button = digitalio.DigitalInOut(pin)
+        button.direction = digitalio.Direction.INPUT
+        button.pull = digitalio.Pull.UP
+        print("o Button initialized on", pin)
+        return button
+    except Exception as e:
+        print("o Button init failed:", e)
+        return button_stub()
+
+def init_hardware(nvm=None, boot=None):
+    """Initialize all hardware with fallbacks
+    nvm holds the cached hardware profile; boot (a boot_timer) gets a mark per peripheral.
+    The mic is returned unopened (lazy_mic): it starts on the first read.
+    """
+    global have_hardware
+    if board is None:
+        print("o Failed to import hardware libraries - running in stub mode")
+        return led_stub(), button_stub(), pixel_stub(1), pixel_stub(32), None
+    have_hardware = True
+    if boot is None:
+        boot = boot_timer()
+    profile = hardware_profile(nvm)
+    if profile.load():
+        print("o Using the cached hardware profile")
+    boot.mark("profile")
 
     # LED init
     try:
@@ -75,12 +364,13 @@ def init_hardware():
         led.direction = digitalio.Direction.OUTPUT
     except Exception:
         led = led_stub()
+    boot.mark("led")
 
     # Single NeoPixel
     try:
         np_pin = getattr(board, "NEOPIXEL", None)
         if np_pin is not None:
-            pixel = neopixel.NeoPixel(np_pin, 1, brightness=0.01, auto_write=False)
+            pixel = neopixel.NeoPixel(np_pin, 1, brightness=1.0, auto_write=False)
             print("o Single NeoPixel initialized on", np_pin)
         else:
             print("o No NEOPIXEL pin found")
@@ -88,65 +378,21 @@ def init_hardware():
     except Exception as e:
         print("o NeoPixel init failed:", e)
         pixel = pixel_stub(1)
+    boot.mark("pixel")
 
     # FeatherWing 32-LED strip
-    try:
-        fw_pin = None
-        for pin_name in ('D6', 'D5', 'D9', 'D10'):
-            if hasattr(board, pin_name):
-                fw_pin = getattr(board, pin_name)
-                try:
-                    pixel32 = neopixel.NeoPixel(fw_pin, 32, brightness=0.04, auto_write=False)
-                    print("o FeatherWing initialized on", fw_pin)
-                    break
-                except Exception:
-                    continue
-        if fw_pin is None:
-            print("o No valid FeatherWing pin found")
-            pixel32 = pixel_stub(32)
-    except Exception as e:
-        print("o FeatherWing init failed:", e)
-        pixel32 = pixel_stub(32)
+    pixel32 = init_featherwing(profile)
+    boot.mark("featherwing")
 
     # Button
-    if have_hardware:
-        button_pin = getattr(board, 'BUTTON', None)
-        if button_pin is None:
-            for name in ('D9', 'D5', 'SW1', 'BTN', 'BOOT'):
-                button_pin = getattr(board, name, None)
-                if button_pin is not None:
-                    break
-        if button_pin is not None:
-            try:
-                button = digitalio.DigitalInOut(button_pin)
-                button.direction = digitalio.Direction.INPUT
-                button.pull = digitalio.Pull.UP
-                print("o Button initialized on", button_pin)
-            except Exception as e:
-                print("o Button init failed:", e)
-                button = button_stub()
-        else:
-            print("o No button pin found")
-            button = button_stub()
-    else:
-        button = button_stub()
+    button = init_button(find_button_pin(profile))
+    boot.mark("button")
 
-    # Microphone (optional)
-    try:
-        import pio_i2s # pyright: ignore[reportMissingImports] # tpe: ignore
-        mic = pio_i2s.I2S(
-            data_in=getattr(board, 'D10', None),
-            bit_clock=getattr(board, 'D11', None),
-            channel_count=1,
-            sample_rate=48000,
-            bits_per_sample=16,
-            samples_signed=True,
-            buffer_size=4096,
-            peripheral=False,
-        )
-        print("o Microphone initialized")
-    except Exception as e:
-        print("o Microphone init failed:", e)
-        mic = None
+    # Only written when the probe found something new
+    profile.save()
+    boot.mark("profile save")
+
+    # Microphone (optional): opened by the first capture, after the first frame
+    mic = lazy_mic(open_mic)
 
-    return led, button, pixel, pixel32, mic
\ No newline at end of file
+    return led, button, pixel, pixel32, mic
@@ -1,565 +1,299 @@
 # Animation patterns and utilities
-import time
+from mylib.clock import system_clock
+from mylib.compositor import compositor
+from mylib.output import output_stage
+from mylib.overlay import overlay, overlay_queue
+from mylib.capture import capture_ring
+from mylib.audio import audio_levels
+from mylib.beat import beat_tracker, tempo_clock
+from mylib.gestures import SHORT, MEDIUM, LONG, DOUBLE, HOLD, HOLD_END
+from mylib.modes import BRIGHTNESS_LEVELS, flag_mode, firework_mode, gradient_mode, brightness_mode, vu_mode, spectrum_mode
 
 class light_show:
-    def __init__(self, led, pixel, pixel32):
+    def __init__(self, led, pixel, pixel32, mic=None, clock=None):
+        self.clock = clock if clock is not None else system_clock()
         self.led = led
         self.pixel = pixel
         self.pixel32 = pixel32
+        # Layer stack, flattened and pushed in one copy per frame:
+        # base animation, then mode/set overlays, then the button progress bar
+        self.layers = compositor(len(pixel32))
+        self.base = self.layers.add(visible=True)
+        self.overlay_layer = self.layers.add()
+        self.progress = self.layers.add(keyed=True)  # Unlit bar pixels let the animation through
+        # Every mode renders into the base layer
+        self.frame = self.base.frame
         
-        # French flag colors (blue, white, red)
-        self.sets = [
-            [(0, 0, 255), (128, 128, 128), (255, 0, 0)],      # Set 0 - France (blue, white, red)
-            [(128, 128, 128), (0, 0, 255), (255, 0, 0), (255, 200, 0)],  # Set 1 - Philippines (white, blue, red, yellow)
-            [(255, 0, 0), (128, 128, 128), (255, 0, 0)],      # Set 2 - Canada (red, white, red)
-            [(0, 0, 255), (255, 0, 0), (128, 128, 128)],      # Set 3 - USA (blue, red, white)
-            [(0, 51, 153), (255, 255, 0), (0, 51, 153)]       # Set 4 - EU (blue, yellow, blue)
-        ]
+        # Brightness levels of the brightness mode, starting at its default (10%)
+        self.brightness_levels = BRIGHTNESS_LEVELS
+        self.current_brightness = BRIGHTNESS_LEVELS[brightness_mode.default_set]
+        # Gamma + brightness lookup shared by the FeatherWing and the onboard pixel
+        self.output = output_stage(self.current_brightness, len(pixel32))
         
-        # Brightness settings for mode 3
-        self.brightness_levels = [
-            0.02,  # Set 0: 2%
-            0.05,  # Set 1: 5%
-            0.10,  # Set 2: 10%
-            0.25,  # Set 3: 25%
-            0.50,  # Set 4: 50%
-            0.75,  # Set 5: 75%
-            1.00   # Set 6: 100%
-        ]
-        self.current_brightness = 0.10  # Start at 10%
+        # Mic blocks land in a capture ring; levels are measured from it once per frame
+        # by the main loop (all zero without a mic)
+        self.capture = capture_ring(mic) if mic is not None else None
+        self.audio = audio_levels(self.capture)
+        # Beat tracking on the mic levels drives a tempo clock the beat-aware modes follow
+        self.tempo = tempo_clock(now=self.clock.monotonic())
+        self.beat = beat_tracker(self.audio, self.tempo)
         
-        # State
-        self.mode = 0  # 0=cycle, 1=solid, 2=gradient, 3=settings
-        self.mode_count = 4  # Added settings mode
-        self.mode_sets = [0, 0, 0, 2]  # Remember set for each mode (brightness mode starts at 2 = 10%)
+        # Mode registry: 0=flags, 1=explosions, 2=gradient, 3=settings, 4=VU meter, 5=spectrum
+        n = len(pixel32)
+        brightness = brightness_mode(self)
+        self.modes = [flag_mode(n), firework_mode(n), gradient_mode(n), brightness,
+                      vu_mode(self.audio), spectrum_mode(self.audio)]
+        self.mode_count = len(self.modes)
+        # Hold-to-ramp changes the brightness mode's set from any mode
+        self.brightness_mode = self.modes.index(brightness)
         # Number of sets available in each mode
-        self.sets_per_mode = [
-            5,  # Mode 0 (flags): 5 sets (0-4)
-            5,  # Mode 1 (explosion): 5 sets (0-4)
-            5,  # Mode 2 (gradient): 5 sets (0-4)
-            7   # Mode 3 (settings): 7 brightness levels (0-6)
-        ]
-        self.set_idx = 0
+        self.sets_per_mode = [m.set_count for m in self.modes]
+        
+        # State
+        self.mode = 0
+        self.mode_sets = [m.default_set for m in self.modes]  # Remember set for each mode
+        self.set_idx = self.mode_sets[self.mode]
         self.active = True
-        self.palette_pos = 0
-        self.rotate_pos = 0
-        self.last_step = time.monotonic()
-        self.last_palette_change = time.monotonic()
+        self.palette_pos = 0  # Animation step of the current mode
+        # Mode and set the current mode was last prepared for
+        self._prepared_mode = None
+        self._prepared_set = None
+        # Timed indicators drawn over the animation, and when the feedback flash ends
+        self.overlays = overlay_queue()
+        self.overlay_period = 0.02  # Frame period while an overlay is up (smooth scrolling)
+        self._flash_until = None
+        # Saved by a long press and restored on wake
+        self.saved_mode = 0
+        self.saved_set_idx = 0
+        self.on_off = None  # Called after a long press turns the show off
+        self.settings = None  # settings_store, flushed on turn_off() (set by app.build)
+        self._ramp = 1  # Direction of the next hold-to-ramp brightness step
 
     def flash_feedback(self, duration=0.08):
+        """Flash the LED and onboard pixel; update_indicators() turns them off"""
         self.led.value = True
-        if self.pixel:
-            self.pixel[0] = (255, 255, 255)
-            self.pixel.show()
-        time.sleep(duration)
-        self.led.value = False
-        if self.pixel:
-            self.pixel[0] = (0, 0, 0)
-            self.pixel.show()
+        self.show_status_color((255, 255, 255))
+        self._flash_until = self.clock.monotonic() + duration
 
-    def show_palette_color(self, color):
-        self.pixel32.fill(color)
+    def update_indicators(self, now):
+        """Expire the feedback flash once its deadline has passed"""
+        if self._flash_until is not None and now >= self._flash_until:
+            self._flash_until = None
+            self.led.value = False
+            self.show_status_color((0, 0, 0))
+
+    def show_frame(self):
+        """Flatten the layers, push them through the output stage to the FeatherWing and latch it"""
+        out = self.layers.flatten()
+        self.output.push(out.buf, self.pixel32)
         self.pixel32.show()
+
+    def show_status_color(self, color):
+        """Set the onboard pixel through the same output stage"""
         if self.pixel:
-            self.pixel[0] = color
+            self.pixel[0] = self.output.color(color)
             self.pixel.show()
 
+    def show_palette_color(self, color, duration=0.15):
+        self.overlays.push(overlay(None, color, duration, fill=True))
+        self.show_status_color(color)
+
     def show_off(self):
-        self.pixel32.fill((0, 0, 0))
-        self.pixel32.show()
-        if self.pixel:
-            self.pixel[0] = (0, 0, 0)
-            self.pixel.show()
+        self.frame.clear()
+        self.overlays.clear()
+        self.overlay_layer.hide()
+        self.show_frame()
+        self.show_status_color((0, 0, 0))
         self.led.value = False
 
-    def show_set_number(self, number, color=(0, 0, 64), duration=0.4):  # dim blue for sets
-        """Display a set number (S0-S2) on the 4x8 LED grid"""
-        # Use your existing pixel font but with S prefix
-        patterns = [
-            # Set 0 - "S0"
-            [
-                1, 1, 1, 1, 0, 0, 1, 0,  # Row 0: S    0
-                1, 1, 0, 0, 0, 1, 0, 1,  # Row 1: S    0
-                0, 0, 1, 1, 0, 1, 0, 1,  # Row 2: S    0
-                1, 1, 1, 1, 0, 0, 1, 0   # Row 3: S    0
-            ],
-            # Set 1 - "S1"
-            [
-                1, 1, 1, 1, 0, 0, 1, 0,  # Row 0: S    1
-                1, 1, 0, 0, 0, 1, 1, 0,  # Row 1: S    1
-                0, 0, 1, 1, 0, 0, 1, 0,  # Row 2: S    1
-                1, 1, 1, 1, 0, 1, 1, 1   # Row 3: S    1
-            ],
-            # Set 2 - "S2"
-            [
-                1, 1, 1, 1, 0, 1, 1, 0,  # Row 0: S    2
-                1, 1, 0, 0, 0, 0, 0, 1,  # Row 1: S    2
-                0, 0, 1, 0, 0, 1, 1, 0,  # Row 2: S    2
-                1, 1, 1, 1, 0, 1, 1, 1   # Row 3: S    2
-            ],
-            # Set 3 - "S3"
-            [
-                1, 1, 1, 1, 0, 1, 1, 1,  # Row 0: S    3
-                1, 1, 0, 0, 0, 0, 1, 1,  # Row 1: S    3
-                0, 0, 1, 1, 0, 0, 0, 1,  # Row 2: S    3
-                1, 1, 1, 1, 0, 1, 1, 1   # Row 3: S    3
-            ],
-            # Set 4 - "S4"
-            [
-                1, 1, 1, 1, 0, 0, 0, 1,  # Row 0: S    4
-                1, 1, 0, 0, 0, 0, 1, 1,  # Row 1: S    4
-                0, 0, 1, 1, 0, 1, 1, 1,  # Row 2: S    4
-                1, 1, 1, 1, 0, 0, 0, 1   # Row 3: S    4
-            ],
-            # Set 5 - "S5"
-            [
-                1, 1, 1, 1, 0, 1, 1, 1,  # Row 0: S    5
-                1, 1, 0, 0, 0, 1, 1, 0,  # Row 1: S    5
-                0, 0, 1, 1, 0, 0, 0, 1,  # Row 2: S    5
-                1, 1, 1, 1, 0, 1, 1, 0   # Row 3: S    5
-            ]
-        ]
-        
-        # Only clamp if not in brightness mode (mode 3)
-        if self.mode != 3:
-            number = max(0, min(len(patterns) - 1, number))
-        pattern = patterns[number]
+    def on_gesture(self, gesture, value):
+        """Act on a button gesture from mylib.gestures (value: press duration or repeat count)"""
+        if not self.active:
+            # Off: only a long press does anything
+            if gesture == LONG:
+                self.wake()
+            return
+        # Indicators from an earlier press are stale now
+        self.overlays.clear()
+        if gesture == SHORT:
+            self.next_set(1)
+        elif gesture == DOUBLE:
+            self.next_set(-1)
+        elif gesture == MEDIUM:
+            self.next_mode()
+        elif gesture == LONG:
+            self.turn_off()
+        elif gesture == HOLD:
+            self.ramp_brightness()
+        elif gesture == HOLD_END:
+            # The bar followed the ramp; the level it stopped on scrolls past once
+            brightness = self.modes[self.brightness_mode]
+            self.show_text(brightness.label(self.mode_sets[self.brightness_mode]), color=(32, 32, 32))
+            print("Brightness: %d%%" % round(self.current_brightness * 100))
+
+    def next_set(self, step):
+        """Short press: next set (double click: previous) of the current mode"""
+        # Use sets_per_mode to determine the max sets for current mode
+        max_sets = self.sets_per_mode[self.mode]
+        self.set_idx = (self.set_idx + step) % max_sets
+        self.palette_pos = 0
+        print(f"Set: {self.set_idx}")
         
-        # Clear display
-        self.pixel32.fill((0, 0, 0))
+        mode = self.modes[self.mode]
+        if mode.shows_set_number:
+            self.show_set_number(self.set_idx, color=(0, 0, 64))  # dim blue
+            # Show first color of new set (from the mode's own sets: the audio modes have more)
+            self.show_palette_color(mode.sets[self.set_idx][0])
+        else:
+            # e.g. the brightness mode: show the new level as a percentage
+            self.show_text(mode.label(self.set_idx), color=(32, 32, 32))
+
+    def next_mode(self):
+        """Medium press: next mode, back on the set it was last left at"""
+        # Save current set for the old mode
+        self.mode_sets[self.mode] = self.set_idx
         
-        # Display pattern
-        for row in range(4):
-            for col in range(8):
-                pattern_idx = row * 8 + col
-                if pattern[pattern_idx]:
-                    self.pixel32[pattern_idx] = color
+        # Switch to next mode
+        self.mode = (self.mode + 1) % self.mode_count
+        # Restore the saved set for the new mode
+        self.set_idx = self.mode_sets[self.mode]
+        self.palette_pos = 0
         
-        self.pixel32.show()
-        time.sleep(duration)
+        print(f"Mode: {self.mode}, Set: {self.set_idx}")
+        # Show mode number on the grid, then the current set number for this mode
+        # (if the mode shows them); both are overlays so the loop keeps running
+        if self.modes[self.mode].shows_set_number:
+            self.show_number(self.mode, color=(64, 64, 0), duration=0.7)  # yellow number
+            self.show_set_number(self.set_idx, color=(0, 0, 64))  # dim blue
+        else:
+            self.show_number(self.mode, color=(64, 64, 0))  # yellow number
+
+    def ramp_brightness(self):
+        """Click-and-hold: step through the brightness levels, turning around at either end"""
+        # The level lives in the brightness mode's set
+        brightness = self.brightness_mode
+        idx = self.set_idx if self.mode == brightness else self.mode_sets[brightness]
+        last = len(self.brightness_levels) - 1
+        if not 0 <= idx + self._ramp <= last:
+            self._ramp = -self._ramp
+        idx += self._ramp
+        self.mode_sets[brightness] = idx
+        if self.mode == brightness:
+            self.set_idx = idx
+        self.set_brightness(self.brightness_levels[idx])
+        # A still bar: scrolling text would restart before it got readable at every repeat
+        self.show_bar(self.modes[brightness].bar_pixels[idx], color=(64, 64, 64))
+
+    def turn_off(self):
+        """Long press: blank everything until a long press wakes the show"""
+        # Save current state before shutting down
+        self.saved_mode = self.mode
+        self.saved_set_idx = self.set_idx
+        self.active = False
+        print("Off")
+        self.show_off()
+        if self.settings is not None:
+            self.settings.flush(self)
+        if self.on_off is not None:
+            self.on_off()
+
+    def wake(self):
+        """Long press while off: restore the state from before turn_off()"""
+        self.active = True
+        self.mode = self.saved_mode
+        self.set_idx = self.saved_set_idx
+        self.palette_pos = 0
+        print(f"Wake: mode {self.mode}, set {self.set_idx}")
+        self.flash_feedback(0.12)
+
+    def show_set_number(self, number, color=(0, 0, 64), duration=0.4):  # dim blue for sets
+        """Display a set number ("S0", "S1", ...) on the 4x8 LED grid"""
+        self.show_text("S%d" % number, color, duration)
 
     def show_number(self, number, color=(64, 64, 0), duration=0.4):
-        """Display a mode number (M0-M2) on the 4x8 LED grid
-        Modes: 0=cycle, 1=solid, 2=gradient
+        """Display a mode number ("m0", "m1", ...) on the 4x8 LED grid
         Layout is 4 rows × 8 columns, indexed like:
          0  1  2  3  4  5  6  7
          8  9 10 11 12 13 14 15
         16 17 18 19 20 21 22 23
         24 25 26 27 28 29 30 31
         """
-        # Define patterns for a 4×8 grid (4 rows × 8 columns)
-        patterns = [
-            # Mode 0 (flags) - "m0"
-            [
-                1, 0, 0, 1, 0, 0, 1, 0,  # Row 0: m    0
-                1, 1, 1, 1, 0, 1, 0, 1,  # Row 1: m    0
-                1, 0, 1, 1, 0, 1, 0, 1,  # Row 2: m    0
-                1, 0, 0, 1, 0, 0, 1, 0   # Row 3: m    0
-            ],
-            # Mode 1 (explosions) - "m1"
-            [
-                1, 0, 0, 1, 0, 0, 1, 0,  # Row 0: m    1
-                1, 1, 1, 1, 0, 1, 1, 0,  # Row 1: m    1
-                1, 0, 1, 1, 0, 0, 1, 0,  # Row 2: m    1
-                1, 0, 0, 1, 0, 1, 1, 1   # Row 3: m    1
-            ],
-            # Mode 2 (gradient) - "m2"
-            [
-                1, 0, 0, 1, 0, 1, 1, 0,  # Row 0: m    2
-                1, 1, 1, 1, 0, 0, 0, 1,  # Row 1: m    2
-                1, 0, 1, 1, 0, 1, 1, 0,  # Row 2: m    2
-                1, 0, 0, 1, 0, 1, 1, 1   # Row 3: m    2
-            ],
-            # Mode 3 (settings) - "m3"
-            [
-                1, 0, 0, 1, 0, 1, 1, 1,  # Row 0: m    3
-                1, 1, 1, 1, 0, 0, 1, 1,  # Row 1: m    3
-                1, 0, 1, 1, 0, 0, 0, 1,  # Row 2: m    3
-                1, 0, 0, 1, 0, 1, 1, 1   # Row 3: m    3
-            ]
-        ]
+        self.show_text("m%d" % number, color, duration)
 
-        # Ensure number is in valid range
-        number = max(0, min(len(patterns) - 1, number))  # Clamp to valid index
-        
-        # Ensure number is valid
-        if number < 0 or number >= len(patterns):
-            return
-            
-        pattern = patterns[number]
-        
-        # Clear display
-        self.pixel32.fill((0, 0, 0))
-        
-        # Clear display
-        self.pixel32.fill((0, 0, 0))
-        
-        # Display 4×8 pattern (4 rows, 8 columns per row)
-        for row in range(4):  # 4 rows
-            for col in range(8):  # 8 columns per row
-                pattern_idx = row * 8 + col  # Index into the pattern array
-                pixel_idx = pattern_idx  # Direct mapping - pattern matches LED layout
-                
-                if pattern[pattern_idx]:
-                    self.pixel32[pixel_idx] = color
-        
-        self.pixel32.show()
-        time.sleep(duration)
+    def show_text(self, text, color=(64, 64, 0), duration=0.4, step=0.06):
+        """Queue text as an overlay shown for duration; text wider than the grid scrolls across once instead"""
+        self.overlays.push(overlay(text, color, duration, scroll_step=step, width=self.frame.width))
 
-    def animate_step(self):
-        now = time.monotonic()
-        dt = now - self.last_step
-        if dt < 0.02:  # ~50Hz update
-            return
-        self.last_step = now
+    def show_bar(self, length, color=(64, 64, 64), duration=0.4):
+        """Light length pixels from the top left as an overlay, e.g. the brightness bar"""
+        self.overlays.push(overlay(None, color, duration, bar=length))
 
-        if not self.active:
-            return
+    def set_brightness(self, brightness):
+        self.current_brightness = brightness
+        self.output.set_brightness(brightness)
 
-        # Don't fetch palette in brightness mode
-        if self.mode == 3:
-            palette = [(64, 64, 64)]  # Just need a single color for brightness bar
-        else:
-            palette = self.sets[self.set_idx]
-            
-        if self.mode == 0:
-            # flag display mode
-            self.pixel32.fill((0, 0, 0))  # Clear first
-            
-            if self.set_idx == 0:  # France - vertical stripes
-                for row in range(4):
-                    # Left stripe (blue) - 2 pixels
-                    for col in range(2):
-                        self.pixel32[row * 8 + col] = palette[0]
-                    # Middle stripe (white) - 4 pixels
-                    for col in range(2, 6):
-                        self.pixel32[row * 8 + col] = palette[1]
-                    # Right stripe (red) - 2 pixels
-                    for col in range(6, 8):
-                        self.pixel32[row * 8 + col] = palette[2]
+    def frame_period(self):
+        """Target time between frames for the current mode (faster while an overlay or the progress bar is up)"""
+        if self.overlays.pending() or self.progress.visible:
+            return self.overlay_period
+        return self.modes[self.mode].frame_period
+
+    def step_period(self):
+        """Time between clock-driven animation steps (modes without one step every frame)"""
+        mode = self.modes[self.mode]
+        return mode.step_period or mode.frame_period
 
-            elif self.set_idx == 1:  # Philippines - white triangle pointing right, blue top, red bottom
-                # First set the blue top and red bottom
-                for row in range(4):
-                    for col in range(8):
-                        if row < 2:
-                            self.pixel32[row * 8 + col] = palette[1]  # Blue top half
-                        else:
-                            self.pixel32[row * 8 + col] = palette[2]  # Red bottom half
-                
-                # Create white triangle pointing right
-                # All 4 pixels in leftmost column
-                for row in range(4):
-                    self.pixel32[row * 8] = palette[0]
-                # 3 pixels in second column
-                for row in range(0, 3):
-                    self.pixel32[row * 8 + 1] = palette[0]
-                # 2 pixels in third column
-                for row in range(1, 3):
-                    self.pixel32[row * 8 + 2] = palette[0]
-                # 1 pixel in fourth column
-                self.pixel32[1 * 8 + 3] = palette[0]  # Middle point of triangle
-                
-                # Define the pattern points for blue and red sections
-                pattern_points = [
-                    (0, 5), (0, 6),  # Two dots in first row
-                    (1, 5), (1, 7)   # Two dots with gap in second row
-                ]
-                
-                # Apply pattern to both blue and red sections
-                for row, col in pattern_points:
-                    # Blue dots in top half
-                    self.pixel32[row * 8 + col] = palette[1]  # Blue
-                    # Red dots in bottom half (mirror)
-                    mirror_row = row + 2  # Offset by 2 rows for bottom half
-                    self.pixel32[mirror_row * 8 + col] = palette[2]  # Red
-                
-                # Yellow sun dot in white triangle area
-                self.pixel32[1 * 8 + 2] = palette[3]  # Yellow dot in second row
+    def step_palette(self, now):
+        """Advance clock-stepped animations (mode 1 fireworks) - scheduled every step_period()"""
+        if self.active and self.modes[self.mode].step_period:
+            self.palette_pos += 1
 
-            elif self.set_idx == 2:  # Canada
-                # First fill everything with white
-                for row in range(4):
-                    for col in range(8):
-                        self.pixel32[row * 8 + col] = palette[1]  # White background
+    def update_audio(self, now):
+        """Measure every captured block and feed it to the beat tracker - scheduled by the main loop"""
+        while self.audio.update(now):
+            self.beat.update(now)
 
-                # Two-pixel wide red bars on sides
-                for row in range(4):
-                    # Left red stripe
-                    self.pixel32[row * 8] = palette[0]     # Leftmost column
-                    self.pixel32[row * 8 + 1] = palette[0] # Second column
-                    # Right red stripe
-                    self.pixel32[row * 8 + 6] = palette[0] # Second-to-last column
-                    self.pixel32[row * 8 + 7] = palette[0] # Rightmost column
+    def analysis_period(self):
+        """Time between analyze() slices of the current mode (idles at the frame period without)"""
+        mode = self.modes[self.mode]
+        return mode.analyze_period or mode.frame_period
 
-                # Simple red maple leaf (2x2 square in center)
-                self.pixel32[1 * 8 + 3] = palette[0]  # Top left
-                self.pixel32[1 * 8 + 4] = palette[0]  # Top right
-                self.pixel32[2 * 8 + 3] = palette[0]  # Bottom left
-                self.pixel32[2 * 8 + 4] = palette[0]  # Bottom right
+    def analyze_audio(self, now):
+        """Background analysis of the current mode (the spectrum's FFT) - scheduled every analysis_period()"""
+        if self.active and self.modes[self.mode].analyze_period:
+            self.modes[self.mode].analyze(now)
 
-            elif self.set_idx == 3:  # USA
-                # Blue canton (top left)
-                for row in range(2):
-                    for col in range(3):
-                        self.pixel32[row * 8 + col] = palette[0]
-                # Red and white stripes
-                stripe_colors = [palette[1], palette[2]] * 2  # Red, white pattern
-                for row in range(4):
-                    color = stripe_colors[row]
-                    # Skip canton area for first two rows
-                    start_col = 3 if row < 2 else 0
-                    for col in range(start_col, 8):
-                        self.pixel32[row * 8 + col] = color
+    def animate_step(self, now=None):
+        """Render and show one frame - paced by the main loop scheduler"""
+        if now is None:
+            now = self.clock.monotonic()
+        self.update_indicators(now)
 
-            elif self.set_idx == 4:  # European Union
-                # Blue background
-                self.pixel32.fill(palette[0])
-                # Yellow star circle (8 dots in a circle pattern)
-                star_pixels = [
-                    1 * 8 + 2, 1 * 8 + 5,    # Left and right on row 1
-                    2 * 8 + 2, 2 * 8 + 5,    # Left and right on row 2
-                    0 * 8 + 3, 0 * 8 + 4,    # Top two dots
-                    3 * 8 + 3, 3 * 8 + 4     # Bottom two dots
-                ]
-                for pixel_idx in star_pixels:
-                    self.pixel32[pixel_idx] = palette[1]
+        if self.active:
+            mode = self.modes[self.mode]
+            # Per-set setup only runs when the mode or set changes
+            if self.mode != self._prepared_mode or self.set_idx != self._prepared_set:
+                mode.prepare(self.set_idx)
+                self._prepared_mode = self.mode
+                self._prepared_set = self.set_idx
 
-            else:  # Russia - horizontal stripes
-                stripe_height = 4 // len(palette)
-                for color_idx, color in enumerate(palette):
-                    start_row = color_idx * stripe_height
-                    end_row = start_row + stripe_height
-                    for row in range(start_row, end_row):
-                        for col in range(8):
-                            self.pixel32[row * 8 + col] = color
-            
-            self.pixel32.show()
-        elif self.mode == 1:
-            # explosion pattern using flag colors
-            self.pixel32.fill((0, 0, 0))  # Clear first
-            
-            # Calculate phases for firework effect
-            launch_phase = (self.palette_pos // 2) % 8  # More phases for launch and explosion
-            spark_phase = self.palette_pos % 4  # For twinkling sparks
-            fade_factor = max(0, 7 - launch_phase) / 7  # For color fading
-            
-            # Use colors based on current set with transitions
-            if self.set_idx == 0:  # France
-                colors = [(0, 0, 255), (128, 128, 128), (255, 0, 0)]
-                sparks = [(192, 192, 255), (128, 128, 128), (255, 192, 192)]
-            elif self.set_idx == 1:  # Philippines
-                colors = [(128, 128, 128), (0, 0, 255), (255, 0, 0), (255, 200, 0)]
-                sparks = [(255, 255, 220), (192, 192, 255), (255, 192, 192), (255, 220, 160)]
-            elif self.set_idx == 2:  # Canada
-                colors = [(255, 0, 0), (128, 128, 128)]
-                sparks = [(255, 160, 160), (255, 255, 220)]
-            elif self.set_idx == 3:  # USA
-                colors = [(0, 0, 255), (255, 0, 0), (128, 128, 128)]
-                sparks = [(160, 160, 255), (255, 160, 160), (255, 255, 220)]
-            else:  # EU
-                colors = [(0, 51, 153), (255, 255, 0)]
-                sparks = [(160, 180, 255), (255, 255, 160)]
-            
-            # Color transitions
-            color_idx = (self.palette_pos // 4) % len(colors)
-            next_idx = (color_idx + 1) % len(colors)
-            blend = (self.palette_pos % 4) / 4.0
-            
-            # Blend between current and next color
-            c1 = colors[color_idx]
-            c2 = colors[next_idx]
-            color = (
-                int(c1[0] * (1 - blend) + c2[0] * blend),
-                int(c1[1] * (1 - blend) + c2[1] * blend),
-                int(c1[2] * (1 - blend) + c2[2] * blend)
-            )
-            
-            # Get spark color with similar blending
-            s1 = sparks[color_idx]
-            s2 = sparks[next_idx]
-            spark = (
-                int(s1[0] * (1 - blend) + s2[0] * blend),
-                int(s1[1] * (1 - blend) + s2[1] * blend),
-                int(s1[2] * (1 - blend) + s2[2] * blend)
-            )
-            
-            # Apply fade factor for trail effect
-            def fade_color(c):
-                return (
-                    int(c[0] * fade_factor),
-                    int(c[1] * fade_factor),
-                    int(c[2] * fade_factor)
-                )
-            
-            rotation = (self.palette_pos % 4)  # Smoother rotation
-            
-            if launch_phase < 4:  # Extended launch sequence
-                # Single pixel moving up the center
-                pos = launch_phase
-                launch_col = 3  # Center column (0-7)
-                
-                # Calculate current position and trail
-                for row in range(4):  # For each row
-                    idx = row * 8 + launch_col
-                    if row == (3 - pos):  # Current position (moving up)
-                        self.pixel32[idx] = color  # Bright leading pixel
-                    elif row > (3 - pos):  # Trail below
-                        fade = (row - (3 - pos)) / 3.0  # Fade based on distance
-                        trail_color = (
-                            int(color[0] * (1 - fade) * 0.7),
-                            int(color[1] * (1 - fade) * 0.7),
-                            int(color[2] * (1 - fade) * 0.7)
-                        )
-                        self.pixel32[idx] = trail_color
-                
-            elif launch_phase < 6:  # Initial burst from last launch position
-                # Calculate burst center (where launch ended - top center)
-                center_row = 0
-                center_col = 3
-                
-                # Define burst pattern radiating from center
-                burst_pattern = [
-                    (0, 0),    # Center
-                    (-1, 0),   # Up
-                    (1, 0),    # Down
-                    (0, -1),   # Left
-                    (0, 1),    # Right
-                    (-1, -1),  # Diagonal up-left
-                    (-1, 1),   # Diagonal up-right
-                    (1, -1),   # Diagonal down-left
-                    (1, 1),    # Diagonal down-right
-                ]
-                
-                # Add all burst points based on pattern
-                for dr, dc in burst_pattern:
-                    new_row = center_row + dr
-                    new_col = center_col + dc
-                    if 0 <= new_row < 4 and 0 <= new_col < 8:  # Check bounds
-                        idx = new_row * 8 + new_col
-                        if spark_phase % 2 == 0:
-                            self.pixel32[idx] = color
-                        else:
-                            self.pixel32[idx] = spark
-                
-            elif launch_phase < 7:  # Expanding burst
-                # Define expanding pattern from center
-                center_row = 0
-                center_col = 3
-                
-                # Create expanding ring pattern
-                burst_pixels = []
-                radius = 2  # Larger radius for this phase
-                for row in range(4):
-                    for col in range(8):
-                        # Calculate distance from burst center
-                        dr = row - center_row
-                        dc = col - center_col
-                        distance = abs(dr) + abs(dc)  # Manhattan distance
-                        if distance <= radius:
-                            burst_pixels.append(row * 8 + col)
-                for idx in burst_pixels:
-                    if (idx + spark_phase) % 3 == 0:
-                        self.pixel32[idx] = spark
-                    else:
-                        self.pixel32[idx] = color
-                
-            else:  # Final sparkle and fade
-                sparkle_pixels = [
-                    0 * 8 + 1, 0 * 8 + 6,  # Corner sparkles
-                    3 * 8 + 1, 3 * 8 + 6,
-                    1 * 8 + 0, 1 * 8 + 7,
-                    2 * 8 + 0, 2 * 8 + 7
-                ]
-                for idx in sparkle_pixels:
-                    if (idx + spark_phase) % 2 == 0:
-                        self.pixel32[idx] = fade_color(spark)
-                    else:
-                        self.pixel32[idx] = fade_color(color)
-            
-            if now - self.last_palette_change >= 0.08:  # Even faster for smooth fireworks
+            t = self.palette_pos
+            if mode.beat_steps and self.beat.locked(now):
+                # Follow the music: the step comes from the phase-locked tempo clock
+                t = (self.tempo.position(now) * mode.beat_steps) >> 8
+            mode.render(self.frame, t)
+            if mode.step_period is None:
                 self.palette_pos += 1
-                self.last_palette_change = now
-            
-            self.pixel32.show()
-        elif self.mode == 2:
-            # Spectacular gradient with sparkles and waves
-            time_phase = (self.rotate_pos // 2) % 4  # Slower core animation
-            sparkle_phase = self.rotate_pos % 3      # Fast sparkle effect
-            wave_pos = self.rotate_pos % 8           # Wave position
-            
-            # Create smooth transitions between colors
-            color_idx = (self.rotate_pos // 4) % len(palette)
-            next_idx = (color_idx + 1) % len(palette)
-            blend = (self.rotate_pos % 4) / 4.0
-            
-            c1 = palette[color_idx]
-            c2 = palette[next_idx]
-            mid_color = (
-                int(c1[0] * (1 - blend) + c2[0] * blend),
-                int(c1[1] * (1 - blend) + c2[1] * blend),
-                int(c1[2] * (1 - blend) + c2[2] * blend)
-            )
-            
-            # Calculate bright version for sparkles
-            bright_color = (
-                min(255, int(mid_color[0] * 1.5)),
-                min(255, int(mid_color[1] * 1.5)),
-                min(255, int(mid_color[2] * 1.5))
-            )
-            
-            # Fill with base pattern
-            for row in range(4):
-                for col in range(8):
-                    idx = row * 8 + col
-                    
-                    # Wave effect
-                    wave_offset = (col + wave_pos) % 8
-                    intensity = abs(4 - wave_offset) / 4.0  # Creates a peak in the middle
-                    
-                    # Combine with time-based patterns
-                    if time_phase == 0:  # Horizontal bands
-                        pattern_value = (row + self.rotate_pos) % 4
-                    elif time_phase == 1:  # Vertical bands
-                        pattern_value = (col + self.rotate_pos) % 8
-                    elif time_phase == 2:  # Diagonal pattern
-                        pattern_value = ((row + col + self.rotate_pos) % 4)
-                    else:  # Circular pattern
-                        dist_from_center = abs(row - 1.5) + abs(col - 3.5)
-                        pattern_value = (int(dist_from_center + self.rotate_pos)) % 4
-                    
-                    # Combine pattern and wave
-                    factor = (pattern_value / 4.0 + intensity) / 2
-                    
-                    # Calculate base color with pattern
-                    pixel_color = (
-                        int(mid_color[0] * factor),
-                        int(mid_color[1] * factor),
-                        int(mid_color[2] * factor)
-                    )
-                    
-                    # Add sparkles based on position and phase
-                    if ((row + col + sparkle_phase) % 3 == 0 and 
-                        (abs(4 - wave_offset) < 2)):  # More sparkles near wave peak
-                        self.pixel32[idx] = bright_color
-                    else:
-                        self.pixel32[idx] = pixel_color
-            
-            self.pixel32.show()
-            self.rotate_pos = (self.rotate_pos + 1) % (len(palette) * 4)
-        elif self.mode == 3:
-            # Settings mode - show brightness level
-            # We now use set_idx directly since sets_per_mode handles the range
-            new_brightness = self.brightness_levels[self.set_idx]
-            if new_brightness != self.current_brightness:
-                self.current_brightness = new_brightness
-                self.pixel32.brightness = self.current_brightness
-            
-            # Show brightness bar with custom pixel mapping
-            self.pixel32.fill((0, 0, 0))
-            # Map brightness levels to number of pixels: 2%=2px, 5%=3px, etc.
-            brightness_pixels = [1, 2, 4, 8, 16, 24, 32]  # Pixels for each brightness level (0-6)
-            bar_length = brightness_pixels[self.set_idx]
-            for i in range(bar_length):
-                self.pixel32[i] = (64, 64, 64)  # Dim white for brightness indicator
-            self.pixel32.show()
\ No newline at end of file
+
+            # An active overlay (mode/set number, text) covers the animation until it expires
+            shown = self.overlays.active(now)
+            if shown is not None:
+                shown.render(self.overlay_layer.frame, now)
+                self.overlay_layer.show()
+            else:
+                self.overlay_layer.hide()
+        elif not self.layers.dirty():
+            # Off and nothing changed (e.g. no wake progress bar): leave the LEDs alone
+            return
+
+        self.show_frame()
@@ -0,0 +1,406 @@
+# Animation modes
+# Each mode declares its sets and frame period, does its per-set setup once in
+# prepare(set_idx) and draws a frame with render(frame, t), where t is the
+# mode's animation step. Modes with beat_steps follow the music's tempo clock
+# while a beat is locked (beat_steps steps per beat). The mic is only read while
+# a mode that listens is shown. A mode starts on its default_set; modes that don't
+# show set numbers ("S1") name their sets with label(set_idx) instead. Modes with an
+# analyze_period get analyze(now) called that often, apart from the frames, for work
+# too slow to fit in render().
+from mylib.framebuffer import framebuffer
+from mylib.colormath import ONE, to_fixed, lerp_color, scale_color, qadd8
+from mylib.spectrum import spectrum
+from mylib.assets import (FLAG_NAMES, FLAG_FRAMES, FLAG_PALETTES, FLAG_SPARKS, FRAME_BYTES,
+                          BRIGHTNESS_PERCENT, BAR_PIXELS)
+
+def rgb_list(data):
+    """RGB triples packed in bytes -> list of color tuples"""
+    return [(data[i], data[i + 1], data[i + 2]) for i in range(0, len(data), 3)]
+
+# Flag palettes shared by every flag-based mode: (name, palette, sparks), from the compiled
+# assets (software/assets/patterns.json). sparks holds a lighter twin for each distinct
+# palette color, used by the fireworks
+FLAGS = [(FLAG_NAMES[i], rgb_list(FLAG_PALETTES[i]), rgb_list(FLAG_SPARKS[i]))
+         for i in range(len(FLAG_NAMES))]
+
+# Brightness settings for the settings mode (2% to 100%)
+BRIGHTNESS_LEVELS = [p / 100 for p in BRIGHTNESS_PERCENT]
+
+# Launch trail brightness by distance below the leading pixel (70%, fading out over 3 rows)
+TRAIL_SCALES = (ONE, to_fixed(0.7 * 2 / 3), to_fixed(0.7 / 3), 0)
+
+def distinct_colors(palette):
+    """Palette colors in order without repeats (Canada and EU reuse their first color)"""
+    colors = []
+    for c in palette:
+        if c not in colors:
+            colors.append(c)
+    return colors
+
+class flag_mode:
+    name = "flags"
+    frame_period = 0.1  # Static image, only redrawn to recover from overlays
+    step_period = None
+    beat_steps = None
+    listens = False
+    default_set = 0
+    shows_set_number = True
+    analyze_period = None
+
+    def __init__(self, n):
+        self.sets = [f[1] for f in FLAGS]
+        self.set_count = len(self.sets)
+        # Every flag pre-rendered by the asset compiler, read straight from the bytes constant
+        self._frames = memoryview(FLAG_FRAMES)
+        self._current = None
+
+    def prepare(self, set_idx):
+        """Point at the flag's compiled frame; render() just blits it"""
+        start = set_idx * FRAME_BYTES
+        self._current = self._frames[start:start + FRAME_BYTES]
+
+    def render(self, frame, t):
+        frame.blit(self._current)
+
+class firework_mode:
+    name = "fireworks"
+    frame_period = 0.02
+    step_period = 0.08  # Even faster for smooth fireworks
+    beat_steps = 16  # One full launch and burst per beat when the music has a tempo
+    listens = True  # For the beat
+    default_set = 0
+    shows_set_number = True
+    analyze_period = None
+
+    # Burst center is where the launch ended - top row, center column
+    # Initial burst: the center and its 8 neighbours that fit on the grid
+    burst_core = [row * 8 + col for row in range(4) for col in range(8)
+                  if abs(row) <= 1 and abs(col - 3) <= 1]
+    # Expanding burst: pixels within Manhattan distance 2 of the center
+    burst_pixels = [row * 8 + col for row in range(4) for col in range(8)
+                    if abs(row) + abs(col - 3) <= 2]
+    # Final sparkle and fade
+    sparkle_pixels = [
+        0 * 8 + 1, 0 * 8 + 6,  # Corner sparkles
+        3 * 8 + 1, 3 * 8 + 6,
+        1 * 8 + 0, 1 * 8 + 7,
+        2 * 8 + 0, 2 * 8 + 7
+    ]
+
+    def __init__(self, n):
+        self.sets = [f[1] for f in FLAGS]
+        self.set_count = len(self.sets)
+        self.colors = None
+        self.sparks = None
+        self.color_steps = None
+        self.spark_steps = None
+        self.trail_steps = None
+
+    def prepare(self, set_idx):
+        self.colors = distinct_colors(FLAGS[set_idx][1])
+        self.sparks = FLAGS[set_idx][2]
+        # Every blended color the animation can ask for, indexed by t % (4 * colors),
+        # so render() never builds a color tuple
+        colors = self.colors
+        sparks = self.sparks
+        color_steps = []
+        spark_steps = []
+        for color_idx in range(len(colors)):
+            next_idx = (color_idx + 1) % len(colors)
+            for step in range(4):
+                blend = step * (ONE // 4)
+                color_steps.append(lerp_color(colors[color_idx], colors[next_idx], blend))
+                spark_steps.append(lerp_color(sparks[color_idx], sparks[next_idx], blend))
+        self.color_steps = color_steps
+        self.spark_steps = spark_steps
+        self.trail_steps = [[scale_color(c, s) for s in TRAIL_SCALES] for c in color_steps]
+
+    def render(self, frame, t):
+        # explosion pattern using flag colors
+        frame.clear()  # Clear first
+        
+        launch_phase = (t // 2) % 8  # More phases for launch and explosion
+        spark_phase = t % 4  # For twinkling sparks
+        fade_factor = max(0, 7 - launch_phase) * ONE // 7  # For color fading
+        
+        # Blend between current and next color (and the matching spark color),
+        # one quarter of the way further each step
+        step = t % len(self.color_steps)
+        color = self.color_steps[step]
+        spark = self.spark_steps[step]
+        
+        if launch_phase < 4:  # Extended launch sequence
+            # Single pixel moving up the center
+            pos = launch_phase
+            launch_col = 3  # Center column (0-7)
+            trail = self.trail_steps[step]
+            
+            # Calculate current position and trail
+            for row in range(4):  # For each row
+                idx = row * 8 + launch_col
+                if row == (3 - pos):  # Current position (moving up)
+                    frame[idx] = color  # Bright leading pixel
+                elif row > (3 - pos):  # Trail below
+                    # Fade based on distance
+                    frame[idx] = trail[row - (3 - pos)]
+            
+        elif launch_phase < 6:  # Initial burst from last launch position
+            burst_color = color if spark_phase % 2 == 0 else spark
+            for idx in self.burst_core:
+                frame[idx] = burst_color
+            
+        elif launch_phase < 7:  # Expanding burst
+            for idx in self.burst_pixels:
+                if (idx + spark_phase) % 3 == 0:
+                    frame[idx] = spark
+                else:
+                    frame[idx] = color
+            
+        elif fade_factor:  # Final sparkle and fade (fully faded by the last phase)
+            for idx in self.sparkle_pixels:
+                if (idx + spark_phase) % 2 == 0:
+                    frame[idx] = scale_color(spark, fade_factor)
+                else:
+                    frame[idx] = scale_color(color, fade_factor)
+
+class gradient_mode:
+    name = "gradient"
+    frame_period = 0.02
+    step_period = None  # One step per frame
+    beat_steps = 24  # About the free-running speed at 125 BPM
+    listens = True  # For the beat
+    default_set = 0
+    shows_set_number = True
+    analyze_period = None
+
+    def __init__(self, n):
+        self.sets = [f[1] for f in FLAGS]
+        self.set_count = len(self.sets)
+        self._scratch = framebuffer(n)
+        self._table = None
+        self._steps = 0
+
+    def prepare(self, set_idx):
+        """Render the whole periodic cycle (len(palette) * 4 steps) into one frame table"""
+        palette = self.sets[set_idx]
+        frame = self._scratch
+        self._steps = len(palette) * 4
+        # One bytes object per step, so render() blits without slicing a view
+        table = []
+        for t in range(self._steps):
+            self._render_step(frame, palette, t)
+            table.append(frame.snapshot())
+        self._table = table
+
+    def _render_step(self, frame, palette, t):
+        # Spectacular gradient with sparkles and waves
+        time_phase = (t // 2) % 4  # Slower core animation
+        sparkle_phase = t % 3      # Fast sparkle effect
+        wave_pos = t % 8           # Wave position
+        
+        # Create smooth transitions between colors
+        color_idx = (t // 4) % len(palette)
+        next_idx = (color_idx + 1) % len(palette)
+        blend = (t % 4) * (ONE // 4)
+        
+        mid_color = lerp_color(palette[color_idx], palette[next_idx], blend)
+        
+        # Calculate bright version for sparkles (x1.5)
+        bright_color = (
+            qadd8(mid_color[0], mid_color[0] >> 1),
+            qadd8(mid_color[1], mid_color[1] >> 1),
+            qadd8(mid_color[2], mid_color[2] >> 1)
+        )
+        
+        # Fill with base pattern
+        for row in range(4):
+            for col in range(8):
+                idx = row * 8 + col
+                
+                # Wave effect
+                wave_offset = (col + wave_pos) % 8
+                intensity = abs(4 - wave_offset)  # Creates a peak in the middle, in quarters
+                
+                # Combine with time-based patterns
+                if time_phase == 0:  # Horizontal bands
+                    pattern_value = (row + t) % 4
+                elif time_phase == 1:  # Vertical bands
+                    pattern_value = (col + t) % 8
+                elif time_phase == 2:  # Diagonal pattern
+                    pattern_value = ((row + col + t) % 4)
+                else:  # Circular pattern
+                    # Manhattan distance from the (1.5, 3.5) center, in half steps
+                    dist_from_center = (abs(2 * row - 3) + abs(2 * col - 7)) // 2
+                    pattern_value = (dist_from_center + t) % 4
+                
+                # Combine pattern and wave: (pattern / 4 + intensity / 4) / 2
+                factor = (pattern_value + intensity) * (ONE // 8)
+                
+                # Add sparkles based on position and phase
+                if ((row + col + sparkle_phase) % 3 == 0 and 
+                    (abs(4 - wave_offset) < 2)):  # More sparkles near wave peak
+                    frame[idx] = bright_color
+                else:
+                    # Base color with pattern (factor peaks above 1 on vertical bands)
+                    frame[idx] = scale_color(mid_color, factor)
+
+    def render(self, frame, t):
+        # Replay the precomputed gradient cycle
+        frame.blit(self._table[t % self._steps])
+
+class brightness_mode:
+    name = "brightness"
+    frame_period = 0.1
+    step_period = None
+    beat_steps = None
+    listens = False
+    default_set = 2  # 10%
+    shows_set_number = False  # Its sets are labelled with the level instead
+    analyze_period = None
+
+    # Map brightness levels to number of pixels: 2%=1px, 5%=2px, etc.
+    bar_pixels = BAR_PIXELS
+
+    def __init__(self, show):
+        self.show = show
+        self.sets = BRIGHTNESS_LEVELS
+        self.set_count = len(self.sets)
+        self.bar_length = 0
+
+    def prepare(self, set_idx):
+        # Settings mode - apply the selected brightness level
+        self.show.set_brightness(self.sets[set_idx])
+        self.bar_length = self.bar_pixels[set_idx]
+
+    def label(self, set_idx):
+        return "%d%%" % BRIGHTNESS_PERCENT[set_idx]
+
+    def render(self, frame, t):
+        # Show brightness bar
+        frame.clear()
+        frame.span(0, self.bar_length, (64, 64, 64))  # Dim white for brightness indicator
+
+# Classic green/yellow/red meter ramp
+LEVEL_CLASSIC = [(0, 160, 0), (160, 160, 0), (200, 0, 0)]
+
+def level_sets():
+    """Color ramps for the audio meters: the classic ramp first, then the flag palettes"""
+    return [LEVEL_CLASSIC] + [distinct_colors(f[1]) for f in FLAGS]
+
+def ramp_colors(ramp, count):
+    """Spread a list of colors evenly over count steps"""
+    spans = len(ramp) - 1
+    colors = []
+    for i in range(count):
+        if spans == 0:
+            colors.append(ramp[0])
+            continue
+        pos = i * spans * ONE // (count - 1)
+        idx = min(pos >> 8, spans - 1)
+        colors.append(lerp_color(ramp[idx], ramp[idx + 1], pos - (idx << 8)))
+    return colors
+
+class vu_mode:
+    name = "vu meter"
+    frame_period = 0.02
+    step_period = None
+    beat_steps = None
+    listens = True
+    default_set = 0
+    shows_set_number = True
+    analyze_period = None
+
+    PEAK_COLOR = (128, 128, 128)
+    PEAK_HOLD = 25  # Frames before the peak marker starts falling
+
+    def __init__(self, audio, width=8):
+        self.audio = audio
+        self.width = width
+        self.sets = level_sets()
+        self.set_count = len(self.sets)
+        self.column_colors = None
+        self.peak_col = 0
+        self.peak_age = 0
+
+    def prepare(self, set_idx):
+        """Spread the set's colors across the columns once"""
+        self.column_colors = ramp_colors(self.sets[set_idx], self.width)
+
+    def render(self, frame, t):
+        frame.clear()
+        audio = self.audio
+        lit = (audio.level() * self.width) >> 8
+        for col in range(lit):
+            frame.rect(col, 0, 1, frame.height, self.column_colors[col])
+
+        # Peak marker jumps up with the block peak and falls back after a hold
+        peak = min(self.width - 1, (audio.level(audio.peak) * self.width) >> 8)
+        if peak >= self.peak_col:
+            self.peak_col = peak
+            self.peak_age = 0
+        else:
+            self.peak_age += 1
+            if self.peak_age > self.PEAK_HOLD and self.peak_col > 0:
+                self.peak_col -= 1
+        if self.peak_col > 0:
+            frame.rect(self.peak_col, 0, 1, frame.height, self.PEAK_COLOR)
+
+class spectrum_mode:
+    name = "spectrum"
+    frame_period = 0.02
+    step_period = None
+    beat_steps = None
+    listens = True
+    default_set = 0
+    shows_set_number = True
+    analyze_period = 0.005  # One FFT slice per call, so no call holds up a frame for long
+
+    DECAY = 12  # Bar fall per frame on the 0-256 level scale
+
+    def __init__(self, audio, width=8, height=4):
+        self.audio = audio
+        self.height = height
+        self.analyzer = spectrum(bands=width)
+        self.sets = level_sets()
+        self.set_count = len(self.sets)
+        self.row_colors = None
+        self.bars = [0] * width
+        self.last_block = -1
+        self.fresh = False  # The analyzer finished a window render() hasn't drawn yet
+
+    def prepare(self, set_idx):
+        """Spread the set's colors up the rows once (bottom row first)"""
+        self.row_colors = ramp_colors(self.sets[set_idx], self.height)
+
+    def analyze(self, now):
+        """Run the next slice of the analysis, or start on the newest block once idle
+        Blocks that arrive while a window is being analyzed are skipped"""
+        analyzer = self.analyzer
+        if analyzer.busy():
+            if analyzer.step() is not None:
+                self.fresh = True
+            return
+        audio = self.audio
+        if audio.blocks != self.last_block:
+            self.last_block = audio.blocks
+            analyzer.start(audio.samples, audio.count)
+
+    def render(self, frame, t):
+        bars = self.bars
+        levels = None
+        if self.fresh:
+            self.fresh = False
+            levels = self.analyzer.levels
+        frame.clear()
+        height = self.height
+        colors = self.row_colors
+        for col in range(len(bars)):
+            bar = bars[col] - self.DECAY
+            if levels is not None and levels[col] > bar:
+                bar = levels[col]
+            if bar < 0:
+                bar = 0
+            bars[col] = bar
+            lit = (bar * height + 128) >> 8
+            for r in range(lit):
+                frame[(height - 1 - r) * frame.width + col] = colors[r]
@@ -0,0 +1,37 @@
+# Output stage: gamma + brightness lookup applied while copying a frame to the LEDs
+# The NeoPixel drivers run at brightness 1.0 so scaling happens once, here
+
+GAMMA = 2.2
+
+class output_stage:
+    def __init__(self, brightness, n=32):
+        self.brightness = None
+        self.lut = bytearray(256)
+        self._out = bytearray(n * 3)
+        self.set_brightness(brightness)
+
+    def set_brightness(self, brightness):
+        """Rebuild the 256-entry lookup table, only when the level changes"""
+        if brightness == self.brightness:
+            return
+        self.brightness = brightness
+        lut = self.lut
+        scale = 255 * brightness
+        for i in range(1, 256):
+            v = int(scale * (i / 255) ** GAMMA + 0.5)
+            # Keep lit channels lit so dim levels don't lose a color's hue
+            lut[i] = v if v > 0 else 1
+        lut[0] = 0
+
+    def push(self, buf, pixels):
+        """Translate a framebuffer through the table and bulk copy it to pixels"""
+        lut = self.lut
+        out = self._out
+        for i in range(len(buf)):
+            out[i] = lut[buf[i]]
+        pixels[:] = out
+
+    def color(self, color):
+        """Translate a single (r, g, b) color, e.g. for the onboard pixel"""
+        lut = self.lut
+        return (lut[color[0]], lut[color[1]], lut[color[2]])
@@ -0,0 +1,63 @@
+# Timed indicators (mode/set numbers, text, color flashes, bars) drawn over the animation
+# The main loop composites the active overlay each frame and drops it at its deadline,
+# so showing an indicator never blocks button sampling or animation
+from mylib.font import scroller
+
+class overlay:
+    def __init__(self, text, color, duration, fill=False, scroll_step=0.06, width=8, bar=None):
+        """bar, instead of text: light that many pixels from the first"""
+        self.color = color
+        self.duration = duration
+        self.fill = fill
+        self.bar = bar
+        self.scroll_step = scroll_step
+        self.text = None if fill or bar is not None else scroller(text, color, width)
+        self.start = None
+        self.deadline = None
+
+    def begin(self, now):
+        """Start showing: still text and fills stay up for duration, scrolling text
+        until its last column has left the grid"""
+        self.start = now
+        if self.text is not None and self.text.scrolls:
+            self.deadline = now + (self.text.x - self.text.end) * self.scroll_step
+        else:
+            self.deadline = now + self.duration
+
+    def render(self, frame, now):
+        if self.fill:
+            frame.fill(self.color)
+            return
+        frame.clear()
+        if self.bar is not None:
+            frame.span(0, self.bar, self.color)
+            return
+        self.text.seek(int((now - self.start) / self.scroll_step))
+        self.text.render(frame)
+
+class overlay_queue:
+    """Overlays shown one after another, each from the moment the previous one expires"""
+
+    def __init__(self):
+        self.items = []
+
+    def push(self, item):
+        self.items.append(item)
+
+    def clear(self):
+        self.items = []
+
+    def pending(self):
+        return len(self.items) > 0
+
+    def active(self, now):
+        """The overlay to draw at time now, or None"""
+        items = self.items
+        while items:
+            head = items[0]
+            if head.deadline is None:
+                head.begin(now)
+            if now < head.deadline:
+                return head
+            items.pop(0)
+        return None
@@ -0,0 +1,225 @@
+# Frame timing instrumentation: fixed-size integer histograms, no per-sample allocation
+# app.build() wraps the frame, button and LED latch calls when its PERF const is set;
+# with PERF = const(0) the compiler drops every call site.
+import array
+import gc
+import time
+
+try:
+    from time import ticks_us, ticks_diff  # pyright: ignore[reportAttributeAccessIssue]
+except ImportError:
+    # CircuitPython / CPython: wrap to 30 bits like MicroPython's ticks so readings stay
+    # small ints (the nanosecond read itself is still a long int on the board)
+    TICKS_MASK = 0x3fffffff
+
+    def ticks_us():
+        return (time.monotonic_ns() // 1000) & TICKS_MASK
+
+    def ticks_diff(end, start):
+        diff = (end - start) & TICKS_MASK
+        return diff - (TICKS_MASK + 1) if diff > TICKS_MASK >> 1 else diff
+
+class histogram:
+    """Counts of values in equal-width buckets (the last one takes everything above)"""
+
+    def __init__(self, name, bucket, buckets=12, unit="us"):
+        self.name = name
+        self.bucket = bucket
+        self.unit = unit
+        self.counts = array.array('L', [0] * buckets)
+        self.reset()
+
+    def reset(self):
+        counts = self.counts
+        for i in range(len(counts)):
+            counts[i] = 0
+        self.count = 0
+        self.max = 0
+
+    def add(self, value):
+        i = value // self.bucket
+        last = len(self.counts) - 1
+        if i > last:
+            i = last
+        elif i < 0:
+            i = 0
+        self.counts[i] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def mean(self):
+        """Mean from the bucket midpoints (no running sum that could outgrow a small int)"""
+        if not self.count:
+            return 0
+        total = 0
+        for i in range(len(self.counts)):
+            total += self.counts[i] * (2 * i + 1) * self.bucket // 2
+        return total // self.count
+
+    def percentile(self, pct):
+        """Upper edge of the bucket holding the pct-th percentile"""
+        if not self.count:
+            return 0
+        target = (self.count * pct + 99) // 100
+        seen = 0
+        for i in range(len(self.counts)):
+            seen += self.counts[i]
+            if seen >= target:
+                return (i + 1) * self.bucket
+        return self.max
+
+    def report(self):
+        if not self.count:
+            print("o %s: no samples" % self.name)
+            return
+        print("o %s: n=%d mean~%d p50<%d p95<%d max=%d %s" % (
+            self.name, self.count, self.mean(),
+            self.percentile(50), self.percentile(95), self.max, self.unit))
+        peak = max(self.counts)
+        for i in range(len(self.counts)):
+            n = self.counts[i]
+            if not n:
+                continue
+            label = ">=%d" % (i * self.bucket) if i == len(self.counts) - 1 else "<%d" % ((i + 1) * self.bucket)
+            print("    %8s %6d %s" % (label, n, "#" * (1 + n * 30 // peak)))
+
+class alloc_stats:
+    """Heap bytes allocated per frame for each mode, from gc.mem_alloc() deltas
+    Frames the collector ran in (a negative delta) are left out. Does nothing without mem_alloc.
+    Instrumentation inside the frame wraps its own work in pause()/resume() so it isn't counted.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self.enabled = hasattr(gc, "mem_alloc")
+        self.total = array.array('L', [0] * len(names))
+        self.frames = array.array('L', [0] * len(names))
+        self.max = array.array('L', [0] * len(names))
+        self.start = 0
+        self.paused_at = 0
+
+    def reset(self):
+        for i in range(len(self.names)):
+            self.total[i] = 0
+            self.frames[i] = 0
+            self.max[i] = 0
+
+    def begin(self):
+        if self.enabled:
+            self.start = gc.mem_alloc()
+
+    def pause(self):
+        if self.enabled:
+            self.paused_at = gc.mem_alloc()
+
+    def resume(self):
+        """Leave what was allocated since pause() out of the frame"""
+        if self.enabled:
+            self.start += gc.mem_alloc() - self.paused_at
+
+    def end(self, mode):
+        if not self.enabled:
+            return
+        used = gc.mem_alloc() - self.start
+        if used < 0:
+            return
+        self.total[mode] += used
+        self.frames[mode] += 1
+        if used > self.max[mode]:
+            self.max[mode] = used
+
+    def report(self):
+        if not self.enabled:
+            print("o alloc: no gc.mem_alloc here")
+            return
+        for i in range(len(self.names)):
+            if self.frames[i]:
+                print("o alloc %s: n=%d mean=%d max=%d B/frame" % (
+                    self.names[i], self.frames[i], self.total[i] // self.frames[i], self.max[i]))
+
+class perf_stats:
+    def __init__(self, clock, mode_names=()):
+        self.clock = clock
+        self.frame = histogram("frame interval", 2000)
+        self.late = histogram("frame lateness", 500)
+        self.render = histogram("render", 1000)
+        self.wire = histogram("pixel32.show", 250)
+        self.button = histogram("button update", 100)
+        self.gc = histogram("gc pause", 1000)
+        self.histograms = (self.frame, self.late, self.render, self.wire, self.button, self.gc)
+        self.alloc = alloc_stats(mode_names)
+        self.last_frame = None
+        self.started = clock.monotonic()
+        self.loops_at_start = 0
+
+    def reset(self, sched):
+        for h in self.histograms:
+            h.reset()
+        self.alloc.reset()
+        self.last_frame = None
+        self.started = self.clock.monotonic()
+        self.loops_at_start = sched.loops
+        for t in sched.tasks:
+            t.skipped = 0
+
+    def frame_started(self, start):
+        """Record the time since the previous frame began (ticks_us values)"""
+        if self.last_frame is not None:
+            self.frame.add(ticks_diff(start, self.last_frame))
+        self.last_frame = start
+
+    def print_summary(self, sched):
+        elapsed = self.clock.monotonic() - self.started
+        print("o perf over %.1f s" % elapsed)
+        if elapsed > 0:
+            print("o loop iterations/s: %d" % ((sched.loops - self.loops_at_start) / elapsed))
+        for t in sched.tasks:
+            print("o task %s: runs=%d missed=%d" % (t.name, t.runs, t.skipped))
+        for h in self.histograms:
+            h.report()
+        self.alloc.report()
+
+class timed_pixels:
+    """Pass-through for a NeoPixel object that times show() into a histogram
+    show() runs inside the frame's allocation window; the long ints its own ticks_us()
+    readings allocate on CircuitPython are kept out of the per-mode counts
+    """
+
+    def __init__(self, pixels, hist, alloc):
+        self.pixels = pixels
+        self.hist = hist
+        self.alloc = alloc
+
+    def __setitem__(self, idx, val):
+        self.pixels[idx] = val
+
+    def __getitem__(self, idx):
+        return self.pixels[idx]
+
+    def __len__(self):
+        return len(self.pixels)
+
+    def show(self):
+        alloc = self.alloc
+        alloc.pause()
+        start = ticks_us()
+        alloc.resume()
+        self.pixels.show()
+        alloc.pause()
+        self.hist.add(ticks_diff(ticks_us(), start))
+        alloc.resume()
+
+def serial_console():
+    """A poll function returning the next character typed on the USB serial console, or None"""
+    try:
+        import supervisor  # pyright: ignore[reportMissingImports]
+        import sys
+    except ImportError:
+        return None
+
+    def poll():
+        if supervisor.runtime.serial_bytes_available:
+            return sys.stdin.read(1)
+        return None
+    return poll
@@ -0,0 +1,39 @@
+# Light sleep while the show is off
+# After a long press turns the show off nothing needs to run until the next press,
+# so the main loop's idle hook drops into alarm light sleep with a PinAlarm on the
+# button. The press that wakes the board then goes through the usual wake handling
+# (progress bar, restore after a long hold); a short one just sleeps again.
+
+class power_manager:
+    def __init__(self, handler, show, sched, alarm=None):
+        """alarm is the CircuitPython alarm module (or hardware.alarm_stub); None disables sleep"""
+        self.handler = handler
+        self.show = show
+        self.sched = sched
+        self.alarm = alarm
+        # The button input has to give up its pin for the PinAlarm (polled stubs have none)
+        self.enabled = alarm is not None and getattr(handler.input, 'pin', None) is not None
+        self.sleeps = 0
+        self.slept = 0.0  # Seconds spent in light sleep
+
+    def should_sleep(self):
+        """Off, no gesture in progress and the blank frame already shown"""
+        return (not self.show.active and self.handler.gestures.idle()
+                and not self.show.layers.dirty())
+
+    def idle(self, now, deadline):
+        """Scheduler idle hook: light sleep until the button goes down"""
+        if not self.enabled or not self.should_sleep():
+            return
+        inp = self.handler.input
+        inp.release()
+        wake = self.alarm.pin.PinAlarm(inp.pin, value=False, pull=True)
+        print("o light sleep")
+        self.alarm.light_sleep_until_alarms(wake)
+        inp.claim()
+        woke = self.sched.clock.monotonic()
+        self.sleeps += 1
+        self.slept += woke - now
+        print("o woke after %.1f s" % (woke - now))
+        # Nothing ran while asleep: pick the tasks up from now instead of counting misses
+        self.sched.resume(woke)
@@ -0,0 +1,86 @@
+# Deadline-based scheduler for the main loop
+# Each periodic job keeps its own next deadline and the loop sleeps until the earliest one
+from mylib.clock import system_clock
+
+class task:
+    def __init__(self, name, func, period, start, deferrable=False):
+        self.name = name
+        self.func = func
+        self.period = period
+        self.next = start
+        self.runs = 0
+        self.skipped = 0  # Deadlines dropped because the task ran late
+        self.deferrable = deferrable  # Background work the idle hook may make late
+
+class scheduler:
+    def __init__(self, clock=None):
+        self.clock = clock if clock is not None else system_clock()
+        self.tasks = []
+        self.loops = 0  # Wakeups of run()
+        # Called as idle(now, deadline) before each sleep, e.g. to collect garbage;
+        # deadline leaves out deferrable tasks
+        self.idle = None
+
+    def add(self, name, func, period, start=None, deferrable=False):
+        """Register func(now), called every period seconds
+        If func returns a number it is used as the task's next deadline instead.
+        A deferrable task (background work in small slices) doesn't count as a
+        deadline for the idle hook, which may then run it late.
+        """
+        if start is None:
+            start = self.clock.monotonic()
+        t = task(name, func, period, start, deferrable)
+        self.tasks.append(t)
+        return t
+
+    def next_deadline(self, deferrable=True):
+        """Earliest deadline, of every task or only those that can't be deferred"""
+        deadline = None
+        for t in self.tasks:
+            if t.deferrable and not deferrable:
+                continue
+            if deadline is None or t.next < deadline:
+                deadline = t.next
+        return deadline
+
+    def run_due(self, now):
+        """Run every task whose deadline has passed"""
+        for t in self.tasks:
+            if now < t.next:
+                continue
+            result = t.func(now)
+            t.runs += 1
+            if result is not None:
+                t.next = result
+                continue
+            t.next += t.period
+            if t.next <= now:
+                # Running late: skip the missed frames instead of bursting to catch up
+                missed = int((now - t.next) / t.period) + 1
+                t.skipped += missed
+                t.next += missed * t.period
+
+    def wake(self, t, now):
+        """Bring task t's next run forward to now (e.g. when its period just got shorter)"""
+        if t.next > now:
+            t.next = now
+
+    def resume(self, now):
+        """Make every task due now, e.g. after the board slept through their deadlines"""
+        for t in self.tasks:
+            t.next = now
+
+    def sleep_until_next(self):
+        deadline = self.next_deadline()
+        if self.idle is not None:
+            fixed = self.next_deadline(False)
+            self.idle(self.clock.monotonic(), deadline if fixed is None else fixed)
+        self.clock.sleep(deadline - self.clock.monotonic())
+
+    def run(self, until=None):
+        """Run tasks forever, or until the clock reaches until"""
+        clock = self.clock
+        while until is None or clock.monotonic() < until:
+            self.loops += 1
+            self.run_due(clock.monotonic())
+            self.sleep_until_next()
@@ -0,0 +1,150 @@
+# Persistent settings in microcontroller.nvm
+# Each save writes one fixed-size record: magic, version, sequence number, mode,
+# brightness level, every mode's remembered set and a Fletcher-16 checksum.
+# Saves rotate through SLOTS record slots to spread the flash wear; restore takes the
+# valid record with the newest sequence number. A change is only written once the
+# settings have stayed the same for SETTLE seconds, or right away when the show is
+# turned off (the board may light-sleep and lose power before the next check).
+import struct
+
+MAGIC = 0x4c  # 'L'
+VERSION = 1
+MAX_MODES = 8
+# magic, version, sequence, mode, brightness level, mode count; then MAX_MODES sets and the checksum
+HEADER = "<BBHBBB"
+HEADER_SIZE = struct.calcsize(HEADER)
+SEQ_OFFSET = 2
+RECORD_SIZE = HEADER_SIZE + MAX_MODES + 2
+
+def fletcher16(buf, count):
+    """Fletcher-16 checksum of the first count bytes"""
+    a = 0
+    b = 0
+    for i in range(count):
+        a = (a + buf[i]) % 255
+        b = (b + a) % 255
+    return (b << 8) | a
+
+def newer(seq, than):
+    """Sequence numbers wrap at 16 bits: seq is newer if it is less than half a lap ahead"""
+    return 0 < ((seq - than) & 0xffff) < 0x8000
+
+class settings_store:
+    SLOTS = 8
+    SETTLE = 5.0  # Seconds the settings must stay unchanged before they're written
+    PERIOD = 1.0  # How often the main loop checks for changes
+
+    def __init__(self, nvm, offset=0):
+        """nvm is microcontroller.nvm (or hardware.nvm_stub); None turns persistence off"""
+        self.nvm = nvm
+        self.offset = offset
+        self.enabled = nvm is not None and len(nvm) >= offset + self.SLOTS * RECORD_SIZE
+        # Records without sequence number and checksum: the show as of the last check,
+        # the change waiting to settle and what NVM holds
+        self.current = bytearray(RECORD_SIZE)
+        self.pending = bytearray(RECORD_SIZE)
+        self.saved = bytearray(RECORD_SIZE)
+        self.out = bytearray(RECORD_SIZE)
+        self.changed_at = None
+        self.slot = self.SLOTS - 1  # Slot of the newest record; the first save goes to slot 0
+        self.seq = 0
+        self.writes = 0
+
+    def _slot_start(self, slot):
+        return self.offset + slot * RECORD_SIZE
+
+    def capture(self, show, buf):
+        """Pack the show's persistent state into buf"""
+        mode_sets = show.mode_sets
+        count = min(show.mode_count, MAX_MODES)
+        level = show.brightness_levels.index(show.current_brightness)
+        struct.pack_into(HEADER, buf, 0, MAGIC, VERSION, 0, show.mode, level, count)
+        for i in range(MAX_MODES):
+            if i >= count:
+                value = 0
+            elif i == show.mode:
+                value = show.set_idx  # The current mode's set is only saved to mode_sets on leaving it
+            else:
+                value = mode_sets[i]
+            buf[HEADER_SIZE + i] = value
+
+    def restore(self, show):
+        """Apply the newest valid record to the show; False if there is none"""
+        if not self.enabled:
+            return False
+        best = None
+        best_slot = None
+        for slot in range(self.SLOTS):
+            start = self._slot_start(slot)
+            record = self.nvm[start:start + RECORD_SIZE]
+            magic, version, seq, mode, level, count = struct.unpack_from(HEADER, record, 0)
+            if magic != MAGIC or version != VERSION or count > MAX_MODES:
+                continue
+            checksum = record[RECORD_SIZE - 2] | (record[RECORD_SIZE - 1] << 8)
+            if fletcher16(record, RECORD_SIZE - 2) != checksum:
+                continue
+            if best is None or newer(seq, self.seq):
+                best = record
+                best_slot = slot
+                self.seq = seq
+        if best is None:
+            print("o settings: none saved")
+            return False
+        self.slot = best_slot
+        magic, version, seq, mode, level, count = struct.unpack_from(HEADER, best, 0)
+        # Values that don't fit this build's modes (e.g. written by an older one) are skipped
+        for i in range(min(count, show.mode_count)):
+            if best[HEADER_SIZE + i] < show.sets_per_mode[i]:
+                show.mode_sets[i] = best[HEADER_SIZE + i]
+        if mode < show.mode_count:
+            show.mode = mode
+        show.set_idx = show.mode_sets[show.mode]
+        if level < len(show.brightness_levels):
+            show.set_brightness(show.brightness_levels[level])
+        # Start from the show as restored, so nothing is written until it changes
+        self.capture(show, self.saved)
+        self.pending[:] = self.saved
+        print("o settings restored: mode %d, set %d, brightness %d%% (slot %d)" % (
+            show.mode, show.set_idx, round(show.current_brightness * 100), best_slot))
+        return True
+
+    def update(self, show, now):
+        """Scheduled every PERIOD: write the settings once a change has settled"""
+        if not self.enabled:
+            return
+        current = self.current
+        self.capture(show, current)
+        if current == self.saved:
+            self.pending[:] = current
+            self.changed_at = None
+            return
+        if current != self.pending or self.changed_at is None:
+            # Changed again: start the wait over
+            self.pending[:] = current
+            self.changed_at = now
+        if show.active and now - self.changed_at < self.SETTLE:
+            return
+        self.write()
+
+    def flush(self, show):
+        """Write any change now instead of waiting for it to settle"""
+        if not self.enabled:
+            return
+        self.capture(show, self.current)
+        if self.current != self.saved:
+            self.pending[:] = self.current
+            self.write()
+
+    def write(self):
+        """Write the pending record to the next slot"""
+        self.seq = (self.seq + 1) & 0xffff
+        self.slot = (self.slot + 1) % self.SLOTS
+        out = self.out
+        out[:] = self.pending
+        struct.pack_into("<H", out, SEQ_OFFSET, self.seq)
+        struct.pack_into("<H", out, RECORD_SIZE - 2, fletcher16(out, RECORD_SIZE - 2))
+        start = self._slot_start(self.slot)
+        self.nvm[start:start + RECORD_SIZE] = out
+        self.saved[:] = self.pending
+        self.changed_at = None
+        self.writes += 1
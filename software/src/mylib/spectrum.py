@@ -0,0 +1,245 @@
+# Spectrum analyzer: windowed FFT of the mic stream grouped into log-spaced bands
+# Uses ulab.numpy when the firmware has it, otherwise a fixed-point radix-2 FFT.
+# Window, twiddle, bit-reversal and band tables are all built once in __init__.
+# The fixed-point FFT is far too slow to run in one go inside a frame on the RP2040,
+# so a window is analyzed in slices: start() windows the samples, then each step()
+# runs part of one FFT stage, and the last one turns the bins into band levels.
+import array
+import math
+
+try:
+    from ulab import numpy as np  # pyright: ignore[reportMissingImports]
+except ImportError:
+    np = None
+
+DB_PER_LN = 20 / math.log(10)
+
+class fixed_fft:
+    """In-place radix-2 FFT on integer arrays with Q14 twiddles
+    Each stage halves the values, so the output is the spectrum scaled by 1/n and
+    every product stays inside MicroPython's small-int range
+    """
+
+    def __init__(self, n):
+        self.n = n
+        bits = 0
+        while (1 << bits) < n:
+            bits += 1
+        self.bits = bits  # Number of stages
+        rev = array.array('H', [0] * n)
+        for i in range(n):
+            r = 0
+            for b in range(bits):
+                if i >> b & 1:
+                    r |= 1 << (bits - 1 - b)
+            rev[i] = r
+        self.rev = rev
+        half = n // 2
+        self.cos = array.array('h', [int(round(16384 * math.cos(2 * math.pi * k / n))) for k in range(half)])
+        self.sin = array.array('h', [int(round(16384 * math.sin(2 * math.pi * k / n))) for k in range(half)])
+        self.re = array.array('l', [0] * n)
+        self.im = array.array('l', [0] * n)
+
+    def run(self):
+        """Transform self.re/self.im, which must already be in bit-reversed order"""
+        for stage in range(self.bits):
+            self.stage(stage)
+
+    def stage(self, stage, first=0, last=None):
+        """Butterflies first .. last-1 of one pass of n/2 (stage 0 first); run() is every stage in order"""
+        n = self.n
+        re = self.re
+        im = self.im
+        cos = self.cos
+        sin = self.sin
+        half = 1 << stage
+        size = half << 1
+        step = n // size
+        if last is None:
+            last = n >> 1
+        b = first
+        while b < last:
+            # Butterfly b pairs j and j + half in group b // half
+            offset = b & (half - 1)
+            start = (b >> stage) * size
+            end = min(half, offset + last - b)
+            b += end - offset
+            k = offset * step
+            for j in range(start + offset, start + end):
+                l = j + half
+                wr = cos[k]
+                wi = sin[k]
+                # (re + i*im) * e^(-i*2*pi*k/n)
+                tr = (wr * re[l] + wi * im[l]) >> 14
+                ti = (wr * im[l] - wi * re[l]) >> 14
+                ar = re[j]
+                ai = im[j]
+                re[j] = (ar + tr) >> 1
+                im[j] = (ai + ti) >> 1
+                re[l] = (ar - tr) >> 1
+                im[l] = (ai - ti) >> 1
+                k += step
+
+class spectrum:
+    FLOOR_DB = -48  # Band level 0 (just above the fixed-point FFT's noise floor)
+    # Each input sample is the average of a pair of mic samples (48 kHz -> 24 kHz, bins ~94 Hz
+    # wide at the default 256 points). The average is the anti-alias filter: it only has to
+    # hold back what is above 12 kHz, and only 18-24 kHz folds down into the lower bands.
+    DECIMATE = 2  # The fixed-point loader sums pairs; ulab averages any DECIMATE
+    BUTTERFLIES = 64  # FFT butterflies per step(), so no slice holds up a frame for long
+
+    def __init__(self, n=256, bands=8, use_ulab=True):
+        self.n = n
+        self.bands = bands
+        self.use_ulab = use_ulab and np is not None
+        # Hann window in Q14
+        window = [int(round(16384 * (0.5 - 0.5 * math.cos(2 * math.pi * i / (n - 1))))) for i in range(n)]
+        # Log-spaced band edges over bins 1 .. n/2, each band at least one bin wide
+        half = n // 2
+        edges = [1]
+        for b in range(1, bands + 1):
+            edge = int(round(half ** (b / bands)))
+            edges.append(max(edge, edges[-1] + 1))
+        edges[-1] = half
+        self.band_start = array.array('H', edges[:-1])
+        self.band_end = array.array('H', edges[1:])
+        self.levels = array.array('H', [0] * bands)  # 0-256 per band
+        self.peaks = [0] * bands
+        self.slice = None  # Next step() of the window being analyzed; None when idle
+        if self.use_ulab:
+            self.window = np.array(window) / 16384
+            # A full-scale sine after the Hann window (coherent gain 1/2)
+            self._ref = 32767 * n / 4
+        else:
+            self.window = array.array('h', window)
+            self.fft = fixed_fft(n)
+            self.mag = array.array('l', [0] * half)
+            self.pairs = array.array('l', [0] * n)  # Pair sums start() copies from the block
+            # Same, for 14-bit samples and the fixed FFT's 1/n scaling
+            self._ref = 8191 / 4
+        # Slices after start(): windowing and the FFT stages in parts (none with ulab),
+        # then the band levels
+        self.parts = max(1, half // self.BUTTERFLIES)
+        self.stages = 0 if self.use_ulab else 1 + self.fft.bits * self.parts
+
+    def _load_fixed(self, samples, count):
+        """Sum each pair of samples (zero past count); _window_fixed() does the rest"""
+        pairs = self.pairs
+        j = 0
+        for i in range(self.n):
+            pairs[i] = samples[j] + samples[j + 1] if j + 1 < count else 0
+            j += 2
+
+    def _window_fixed(self):
+        fft = self.fft
+        re = fft.re
+        im = fft.im
+        rev = fft.rev
+        window = self.window
+        pairs = self.pairs
+        # Pair sums back to 14-bit averages, windowed straight into bit-reversed order
+        for i in range(self.n):
+            k = rev[i]
+            re[k] = ((pairs[i] >> 3) * window[i]) >> 14
+            im[k] = 0
+
+    def _band_peaks_fixed(self):
+        fft = self.fft
+        re = fft.re
+        im = fft.im
+        mag = self.mag
+        for k in range(len(mag)):
+            a = re[k]
+            b = im[k]
+            if a < 0:
+                a = -a
+            if b < 0:
+                b = -b
+            # Alpha-max-plus-beta-min estimate of sqrt(a*a + b*b), no sqrt needed
+            mag[k] = a + (b >> 1) - (b >> 3) if a > b else b + (a >> 1) - (a >> 3)
+        peaks = self.peaks
+        for b in range(self.bands):
+            peak = 0
+            for k in range(self.band_start[b], self.band_end[b]):
+                if mag[k] > peak:
+                    peak = mag[k]
+            peaks[b] = peak
+
+    def _band_peaks_ulab(self, samples, count):
+        n = self.n
+        dec = self.DECIMATE
+        x = np.frombuffer(samples, dtype=np.int16)
+        span = n * dec
+        if count < span:
+            return False
+        # Average each group of DECIMATE samples (as floats: int16 sums would overflow)
+        acc = np.zeros(n)
+        for m in range(dec):
+            acc += x[m:span:dec]
+        x = acc * self.window / dec
+        result = np.fft.fft(x)
+        if isinstance(result, tuple):
+            re, im = result
+        else:
+            re, im = np.real(result), np.imag(result)
+        mag = np.sqrt(re * re + im * im)
+        peaks = self.peaks
+        for b in range(self.bands):
+            peaks[b] = np.max(mag[self.band_start[b]:self.band_end[b]])
+        return True
+
+    def busy(self):
+        return self.slice is not None
+
+    def start(self, samples, count):
+        """Take a window from a sample block (copied, so the block may be reused);
+        step() then analyzes it. False if the block is too short (ulab only)"""
+        if self.use_ulab:
+            if not self._band_peaks_ulab(samples, count):
+                return False
+        else:
+            self._load_fixed(samples, count)
+        self.slice = 0
+        return True
+
+    def step(self):
+        """Run the next slice; returns the band levels (0-256) after the last one, else None"""
+        s = self.slice
+        if s is None:
+            return None
+        if s < self.stages:
+            if s == 0:
+                self._window_fixed()
+            else:
+                # FFT stage (s - 1) // parts, its part (s - 1) % parts
+                part = (s - 1) % self.parts
+                size = self.BUTTERFLIES
+                self.fft.stage((s - 1) // self.parts, part * size, min(self.n >> 1, (part + 1) * size))
+            self.slice = s + 1
+            return None
+        self.slice = None
+        if not self.use_ulab:
+            self._band_peaks_fixed()
+        return self._levels()
+
+    def update(self, samples, count):
+        """Analyze one window from a sample block in one go and refresh the band levels"""
+        if not self.start(samples, count):
+            return self.levels
+        levels = self.step()
+        while levels is None:
+            levels = self.step()
+        return levels
+
+    def _levels(self):
+        levels = self.levels
+        floor = self.FLOOR_DB
+        ref = self._ref
+        for b in range(self.bands):
+            peak = self.peaks[b]
+            if peak <= 0:
+                levels[b] = 0
+                continue
+            db = DB_PER_LN * math.log(peak / ref)
+            levels[b] = 0 if db <= floor else min(256, int((db - floor) * 256 / -floor))
+        return levels
@@ -0,0 +1,350 @@
+# Frame cost benchmark: every mode x set, plus the button feedback paths
+# Reports per cell: us per frame (mean and max), bytes allocated per frame and
+# pixel __setitem__ / show() calls per frame.
+#
+# Host:
+#   python3 software/utility/bench.py                      # print the table
+#   python3 software/utility/bench.py --save base.json     # record a baseline
+#   python3 software/utility/bench.py --check base.json    # exit 1 on a regression
+# Every run also checks the host's bytes per frame against ALLOC_BUDGET and exits 1 over it.
+#   python3 software/utility/bench.py --serial /dev/ttyACM0 --save device.json
+# Board: copy this file to CIRCUITPY, then at the REPL: import bench; bench.main()
+# The board prints its results as one JSON line, which --serial reads (needs pyserial).
+import array
+import gc
+import json
+import math
+import sys
+import time
+
+ON_DEVICE = sys.implementation.name in ("circuitpython", "micropython")
+
+if not ON_DEVICE:
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from mylib.clock import virtual_clock  # noqa: E402
+from mylib.hardware import led_stub, pixel_stub, button_stub, mic_stub  # noqa: E402
+from mylib.lightshow import light_show  # noqa: E402
+from mylib.button import button_handler  # noqa: E402
+from mylib.gestures import LONG  # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    ticks_ns = time.perf_counter_ns
+except AttributeError:
+    ticks_ns = time.monotonic_ns
+
+RESULT_MARK = "BENCH-RESULT "
+ANALYSIS_SLICES = 20  # Enough analyze() calls per block for a whole spectrum window
+METRICS = ("us", "us_max", "alloc", "setitem", "show")
+# Differences below these are noise, whatever the percentage
+NOISE = {"us": 5, "us_max": 50, "alloc": 64, "setitem": 0, "show": 0}
+# Metrics compared by --check (us_max is too noisy on a shared host)
+CHECKED = ("us", "alloc", "setitem", "show")
+# Most bytes a frame may allocate, by cell prefix, as tracemalloc counts them on CPython
+# (which includes int and float objects the board doesn't heap-allocate, hence the floor of ~100)
+ALLOC_BUDGET = {
+    "mode0": 128,   # flags: cached frame blit
+    "mode1": 128,   # fireworks: color tables built in prepare()
+    "mode2": 192,   # gradient: precomputed frames
+    "mode3": 256,   # brightness bar
+    "mode4": 192,   # vu meter
+    "mode5": 192,   # spectrum bars (the FFT runs in the analysis task)
+    "analysis": 512,  # one spectrum FFT slice
+    "button": 256,
+}
+
+class counting_pixels(pixel_stub):
+    """pixel_stub that only counts writes and latches
+    The real NeoPixel driver copies in C, so the stub's own Python copy is left out of the numbers
+    """
+    def __init__(self, n):
+        super().__init__(n)
+        self.setitems = 0
+        self.shows = 0
+
+    def __setitem__(self, idx, val):
+        self.setitems += 1
+
+    def show(self):
+        self.shows += 1
+
+def tone_mic():
+    """A steady 440 Hz tone so the audio modes have something to draw"""
+    return mic_stub(array.array('h', [int(8000 * math.sin(2 * math.pi * 440 * i / 48000)) for i in range(4800)]))
+
+def make_show():
+    clock = virtual_clock(100.0)
+    pixel32 = counting_pixels(32)
+    show = light_show(led_stub(), pixel_stub(1), pixel32, tone_mic(), clock)
+    return show, clock, pixel32
+
+class cell:
+    """One benchmark case: frame() is timed, before() (if any) runs untimed ahead of it"""
+    def __init__(self, name, frame, pixels, before=None):
+        self.name = name
+        self.frame = frame
+        self.pixels = pixels
+        self.before = before
+
+def mode_cell(mode_idx, set_idx):
+    show, clock, pixel32 = make_show()
+    show.mode = mode_idx
+    show.set_idx = set_idx
+    mode = show.modes[mode_idx]
+    state = {"next_step": clock.monotonic()}
+
+    def frame():
+        clock.advance(show.frame_period())
+        now = clock.monotonic()
+        if mode.step_period and now >= state["next_step"]:
+            show.step_palette(now)
+            state["next_step"] = now + mode.step_period
+        show.animate_step(now)
+
+    def feed():
+        # Audio capture and analysis are their own tasks; keep them outside the timed frame
+        now = clock.monotonic()
+        show.capture.capture()
+        show.update_audio(now)
+        for _ in range(ANALYSIS_SLICES):
+            show.analyze_audio(now)
+
+    return cell("mode%d:set%d" % (mode_idx, set_idx), frame, pixel32, feed)
+
+def analysis_cell(mode_idx):
+    """One analysis slice at a time: us is a typical slice, us max the worst"""
+    show, clock, pixel32 = make_show()
+    show.mode = mode_idx
+
+    def feed():
+        clock.advance(show.analysis_period())
+        show.capture.capture()
+        show.update_audio(clock.monotonic())
+
+    def frame():
+        show.analyze_audio(clock.monotonic())
+
+    return cell("analysis:mode%d" % mode_idx, frame, pixel32, feed)
+
+def button_cell(stage, held):
+    """Frames while the button has been held for held seconds (stage is a label)"""
+    show, clock, pixel32 = make_show()
+    button = button_stub()
+    handler = button_handler(button, show)
+    if stage == "wake":
+        show.on_gesture(LONG, 2.0)  # Long press: off, waiting for a wake press
+    button.value = False
+    handler.update()
+    clock.advance(held)
+
+    def frame():
+        handler.update()
+        show.animate_step(clock.monotonic())
+
+    return cell("button:%s" % stage, frame, pixel32)
+
+def all_cells():
+    counts = list(make_show()[0].sets_per_mode)
+    for mode_idx, count in enumerate(counts):
+        for set_idx in range(count):
+            yield mode_cell(mode_idx, set_idx)
+    for stage, held in (("short", 0.3), ("medium", 1.0), ("long", 1.8), ("wake", 1.0)):
+        yield button_cell(stage, held)
+    for mode_idx, mode in enumerate(make_show()[0].modes):
+        if mode.analyze_period:
+            yield analysis_cell(mode_idx)
+
+_overhead = None
+
+def tracemalloc_overhead():
+    """Bytes tracemalloc reports around a call that allocates nothing"""
+    global _overhead
+    if _overhead is None:
+        def noop():
+            pass
+        samples = []
+        tracemalloc.start()
+        for _ in range(20):
+            start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            noop()
+            samples.append(tracemalloc.get_traced_memory()[1] - start)
+        tracemalloc.stop()
+        _overhead = min(samples)
+    return _overhead
+
+def measure(c, frames, warmup=10, rounds=3):
+    for _ in range(warmup):
+        if c.before:
+            c.before()
+        c.frame()
+    c.pixels.setitems = 0
+    c.pixels.shows = 0
+
+    # Timing: the median is what a cell normally costs, the max shows spikes.
+    # The best of a few rounds keeps other load on the host out of the comparison.
+    best = None
+    for _ in range(rounds):
+        times = []
+        for _ in range(frames):
+            if c.before:
+                c.before()
+            t0 = ticks_ns()
+            c.frame()
+            times.append(ticks_ns() - t0)
+        times.sort()
+        if best is None or times[len(times) // 2] < best[len(best) // 2]:
+            best = times
+    times = best
+    setitems = c.pixels.setitems / rounds
+    shows = c.pixels.shows / rounds
+
+    # Allocation pass: tracemalloc peak on CPython, mem_free delta with the GC off on the board
+    allocated = 0
+    if tracemalloc is not None:
+        tracemalloc.start()
+        for _ in range(frames):
+            if c.before:
+                c.before()
+            start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            c.frame()
+            allocated += tracemalloc.get_traced_memory()[1] - start
+        tracemalloc.stop()
+        allocated -= frames * tracemalloc_overhead()
+    elif hasattr(gc, "mem_free"):
+        for _ in range(frames):
+            if c.before:
+                c.before()
+            gc.collect()
+            gc.disable()
+            start = gc.mem_free()
+            c.frame()
+            allocated += start - gc.mem_free()
+            gc.enable()
+
+    return {
+        "us": round(times[len(times) // 2] / 1000, 1),
+        "us_max": round(times[-1] / 1000, 1),
+        "alloc": allocated // frames,
+        "setitem": round(setitems / frames, 2),
+        "show": round(shows / frames, 2),
+    }
+
+def run(frames=100):
+    results = {}
+    for c in all_cells():
+        results[c.name] = measure(c, frames)
+        gc.collect()
+    return {"platform": sys.platform, "implementation": sys.implementation.name,
+            "frames": frames, "cells": results}
+
+def print_table(report, other=None):
+    head = "%-16s %9s %9s %8s %8s %6s" % ("cell", "us", "us max", "alloc B", "setitem", "show")
+    if other is not None:
+        head += "   | %9s %8s" % ("other us", "alloc B")
+    print(head)
+    for name, m in report["cells"].items():
+        line = "%-16s %9.1f %9.1f %8d %8.2f %6.2f" % (
+            name, m["us"], m["us_max"], m["alloc"], m["setitem"], m["show"])
+        if other is not None and name in other["cells"]:
+            o = other["cells"][name]
+            line += "   | %9.1f %8d" % (o["us"], o["alloc"])
+        print(line)
+
+def regressions(report, baseline, threshold):
+    """Cells and metrics that got worse than the baseline by more than threshold (a fraction)"""
+    found = []
+    for name, m in report["cells"].items():
+        base = baseline["cells"].get(name)
+        if base is None:
+            continue
+        for key in CHECKED:
+            old = base.get(key, 0)
+            new = m[key]
+            if new - old > NOISE[key] and new > old * (1 + threshold):
+                found.append((name, key, old, new))
+    return found
+
+def over_budget(report):
+    """Cells allocating more per frame than ALLOC_BUDGET allows (host reports only)"""
+    if report["implementation"] != "cpython":
+        return []
+    found = []
+    for name, m in report["cells"].items():
+        budget = ALLOC_BUDGET.get(name.split(":")[0])
+        if budget is not None and m["alloc"] > budget:
+            found.append((name, budget, m["alloc"]))
+    return found
+
+def read_serial(port, timeout=600):
+    """Run the suite on a board over its serial REPL and return its report"""
+    try:
+        import serial  # pyright: ignore[reportMissingImports]
+    except ImportError:
+        raise SystemExit("--serial needs pyserial (pip install pyserial)")
+    with serial.Serial(port, 115200, timeout=1) as s:
+        s.write(b"\x03\x03")  # Stop code.py and get a prompt
+        time.sleep(0.5)
+        s.reset_input_buffer()
+        s.write(b"import bench; bench.main()\r\n")
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            line = s.readline().decode("utf-8", "replace").strip()
+            if line.startswith(RESULT_MARK):
+                return json.loads(line[len(RESULT_MARK):])
+            if line:
+                print("board:", line)
+    raise SystemExit("no result from the board within %d s" % timeout)
+
+def main():
+    if ON_DEVICE:
+        # The board has no argparse; print the table and a JSON line for the host to pick up
+        report = run(frames=30)
+        print_table(report)
+        print(RESULT_MARK + json.dumps(report))
+        return
+
+    import argparse
+    parser = argparse.ArgumentParser(description="Per-frame cost of every mode, set and button path")
+    parser.add_argument("--frames", type=int, default=100, help="timed frames per cell")
+    parser.add_argument("--serial", metavar="PORT", help="run on a board connected at PORT instead")
+    parser.add_argument("--save", metavar="JSON", help="write the results as a baseline")
+    parser.add_argument("--check", metavar="JSON", help="compare with a baseline, exit 1 on regressions")
+    parser.add_argument("--compare", metavar="JSON", help="show another report's numbers alongside")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown as a fraction")
+    args = parser.parse_args()
+
+    report = read_serial(args.serial) if args.serial else run(args.frames)
+    other = None
+    if args.compare:
+        with open(args.compare) as f:
+            other = json.load(f)
+    print_table(report, other)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+        print("o saved", args.save)
+    over = over_budget(report)
+    for name, budget, alloc in over:
+        print("o OVER BUDGET %s: %d B/frame, budget %d" % (name, alloc, budget))
+    if args.check:
+        with open(args.check) as f:
+            baseline = json.load(f)
+        found = regressions(report, baseline, args.threshold)
+        for name, key, old, new in found:
+            print("o REGRESSION %s %s: %s -> %s" % (name, key, old, new))
+        if found:
+            sys.exit(1)
+        print("o no regressions over %d%%" % round(args.threshold * 100))
+    if over:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Time one spectrum window: fixed-point FFT (whole window and slowest slice), plus ulab when importable
+# Then check the anti-alias filter: a 9-15 kHz tone may only light the top band.
+# Host:  python3 software/utility/bench_fft.py [repeats]   (exits 1 if a tone leaks into a lower band)
+# Board: copy this file to CIRCUITPY, then at the REPL: import bench_fft; bench_fft.main()
+# The spectrum mode runs one slice per analyze() call, so the slowest slice is what can
+# hold up a frame; the whole window sets how many blocks per second get analyzed.
+import math
+import sys
+import time
+import array
+
+ON_DEVICE = sys.implementation.name in ("circuitpython", "micropython")
+
+if not ON_DEVICE:
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from mylib import spectrum as spectrum_module  # noqa: E402
+
+try:
+    ticks_ns = time.perf_counter_ns
+except AttributeError:
+    ticks_ns = time.monotonic_ns
+
+def bench(analyzer, samples, repeats):
+    """Mean us per whole window and the slowest single slice (start() or step())"""
+    analyzer.update(samples, len(samples))
+    total = 0
+    worst = 0
+    for _ in range(repeats):
+        t0 = ticks_ns()
+        analyzer.start(samples, len(samples))
+        t1 = ticks_ns()
+        total += t1 - t0
+        worst = max(worst, t1 - t0)
+        while analyzer.busy():
+            t0 = ticks_ns()
+            analyzer.step()
+            t1 = ticks_ns()
+            total += t1 - t0
+            worst = max(worst, t1 - t0)
+    return total / 1000 / repeats, worst / 1000
+
+def tone(hz, amplitude=8000, count=1024):
+    return array.array('h', [int(amplitude * math.sin(2 * math.pi * hz * i / 48000)) for i in range(count)])
+
+def check_alias(analyzer, name):
+    """True if no 9-15 kHz tone lights a band below the top one
+    A band lights a row of the 4-row grid from level 32 up"""
+    ok = True
+    for hz in (9000, 11000, 13000, 15000):
+        levels = list(analyzer.update(tone(hz), 1024))
+        leaked = max(levels[:-1])
+        if leaked >= 32:
+            ok = False
+        print("%s %s %5d Hz: %s" % ("o" if leaked < 32 else "x", name, hz, levels))
+    return ok
+
+def main(repeats=None):
+    if repeats is None:
+        repeats = int(sys.argv[1]) if len(sys.argv) > 1 and not ON_DEVICE else 20
+    samples = tone(1000)
+    for n in (128, 256):
+        fixed = spectrum_module.spectrum(n=n, use_ulab=False)
+        window, worst = bench(fixed, samples, repeats)
+        print("fixed-point n=%d: %8.0f us/window, slowest slice %6.0f us (%d slices)" % (
+            n, window, worst, fixed.stages + 2))
+        print("  levels:", list(fixed.levels))
+    ok = check_alias(spectrum_module.spectrum(use_ulab=False), "fixed-point")
+    if spectrum_module.np is None:
+        print("ulab:        not available")
+    else:
+        fast = spectrum_module.spectrum(use_ulab=True)
+        window, worst = bench(fast, samples, repeats)
+        print("ulab:              %8.0f us/window" % window)
+        print("  levels:", list(fast.levels))
+        ok = check_alias(fast, "ulab") and ok
+    if not ok and not ON_DEVICE:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
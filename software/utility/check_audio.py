@@ -0,0 +1,76 @@
+# Feed synthetic PCM through the stub mic, the capture ring and the level meter
+# A 1 kHz sine must read back its RMS (amplitude / sqrt 2) and peak, and the envelope
+# must rise to the RMS; silence must decay the envelope back to nothing.
+# Usage: python3 software/utility/check_audio.py
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from mylib.hardware import mic_stub  # noqa: E402
+from mylib.capture import capture_ring  # noqa: E402
+from mylib.audio import audio_levels  # noqa: E402
+
+RATE = 48000
+BLOCK = 1024
+AMPLITUDE = 8000
+RMS_TOLERANCE = 0.02  # Relative: the meter measures every DECIMATE-th sample at 12 bits
+
+failures = []
+
+def expect(what, ok, detail):
+    print("%s %s: %s" % ("o" if ok else "x", what, detail))
+    if not ok:
+        failures.append(what)
+
+def run(samples, blocks, levels=None):
+    """Capture and measure blocks of samples (into levels, or a fresh audio_levels)
+    Returns the audio_levels and the ring
+    """
+    ring = capture_ring(mic_stub(samples, RATE), block=BLOCK)
+    if levels is None:
+        levels = audio_levels(ring, BLOCK)
+    else:
+        levels.source = ring
+    for _ in range(blocks):
+        if ring.capture() != BLOCK or not levels.update():
+            failures.append("capture")
+            break
+    return levels, ring
+
+def main():
+    # A whole number of periods, so the looped stub mic plays a continuous tone
+    period = RATE // 1000
+    sine = [int(round(AMPLITUDE * math.sin(2 * math.pi * i / period))) for i in range(period * 64)]
+    levels, ring = run(sine, 20)
+    want = AMPLITUDE / math.sqrt(2)
+    expect("sine rms", abs(levels.rms - want) <= want * RMS_TOLERANCE, "%d (want %d)" % (levels.rms, want))
+    expect("sine peak", levels.peak == AMPLITUDE, "%d (want %d)" % (levels.peak, AMPLITUDE))
+    expect("sine envelope", abs(levels.envelope - levels.rms) <= levels.rms * RMS_TOLERANCE,
+           "%d after %d blocks" % (levels.envelope, levels.blocks))
+    want_level = int((20 * math.log10(want / 32767) + 60) * 256 / 60)
+    expect("sine level", abs(levels.level() - want_level) <= 2, "%d (want %d)" % (levels.level(), want_level))
+    expect("no ring overruns", ring.overruns == 0 and ring.underruns == 0,
+           "%d overruns, %d underruns" % (ring.overruns, ring.underruns))
+
+    # Attack: one block of tone lifts the envelope by ATTACK/256 of the way
+    quiet = audio_levels(None, BLOCK)
+    run(sine, 1, quiet)
+    want = quiet.rms * audio_levels.ATTACK >> 8
+    expect("attack", abs(quiet.envelope - want) <= 1, "%d after one block (want %d)" % (quiet.envelope, want))
+
+    # Release: silence after the tone falls by RELEASE/256 per block down to zero
+    start = levels.envelope
+    run([0] * BLOCK, 1, levels)
+    want = start - (start * audio_levels.RELEASE >> 8)
+    expect("silence rms and peak", levels.rms == 0 and levels.peak == 0, "%d, %d" % (levels.rms, levels.peak))
+    expect("release", abs(levels.envelope - want) <= 1, "%d after one block (want %d)" % (levels.envelope, want))
+    run([0] * BLOCK, 200, levels)
+    expect("silence envelope", levels.envelope == 0, "%d after 200 blocks" % levels.envelope)
+    expect("silence level", levels.level() == 0, "%d" % levels.level())
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
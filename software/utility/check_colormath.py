@@ -0,0 +1,142 @@
+# Check the 8.8 fixed-point color math against the float formulas it replaced
+# Compares lerp_color / scale_color / qadd8 on every channel value at the weights the modes
+# use, then every mode 1 (fireworks) and mode 2 (gradient) frame of every set against a float render.
+# Everything must match exactly except the 70% launch trail, which may be off by one.
+# Usage: python3 software/utility/check_colormath.py
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from mylib.colormath import ONE, lerp_color, scale_color, qadd8  # noqa: E402
+from mylib.framebuffer import framebuffer  # noqa: E402
+from mylib.modes import FLAGS, firework_mode, gradient_mode, distinct_colors  # noqa: E402
+
+TRAIL_TOLERANCE = 1
+
+def float_lerp(c1, c2, blend):
+    return tuple(int(c1[i] * (1 - blend) + c2[i] * blend) for i in range(3))
+
+def float_scale(c, factor):
+    return tuple(min(255, int(c[i] * factor)) for i in range(3))
+
+def float_fireworks(colors, sparks, t):
+    """Mode 1 frame as the float code drew it: {pixel: (color, tolerance)}"""
+    out = {}
+    launch_phase = (t // 2) % 8
+    spark_phase = t % 4
+    fade_factor = max(0, 7 - launch_phase) / 7
+    color_idx = (t // 4) % len(colors)
+    next_idx = (color_idx + 1) % len(colors)
+    blend = (t % 4) / 4.0
+    color = float_lerp(colors[color_idx], colors[next_idx], blend)
+    spark = float_lerp(sparks[color_idx], sparks[next_idx], blend)
+    if launch_phase < 4:
+        pos = launch_phase
+        for row in range(4):
+            idx = row * 8 + 3
+            if row == 3 - pos:
+                out[idx] = (color, 0)
+            elif row > 3 - pos:
+                fade = (row - (3 - pos)) / 3.0
+                out[idx] = (tuple(int(color[i] * (1 - fade) * 0.7) for i in range(3)), TRAIL_TOLERANCE)
+    elif launch_phase < 6:
+        for idx in firework_mode.burst_core:
+            out[idx] = (color if spark_phase % 2 == 0 else spark, 0)
+    elif launch_phase < 7:
+        for idx in firework_mode.burst_pixels:
+            out[idx] = (spark if (idx + spark_phase) % 3 == 0 else color, 0)
+    else:
+        for idx in firework_mode.sparkle_pixels:
+            c = spark if (idx + spark_phase) % 2 == 0 else color
+            out[idx] = (float_scale(c, fade_factor), 0)
+    return out
+
+def float_gradient(palette, t):
+    """Mode 2 frame as the float code drew it: {pixel: (color, tolerance)}"""
+    out = {}
+    t %= len(palette) * 4  # The float code's step wrapped with the palette
+    time_phase = (t // 2) % 4
+    sparkle_phase = t % 3
+    wave_pos = t % 8
+    color_idx = (t // 4) % len(palette)
+    next_idx = (color_idx + 1) % len(palette)
+    mid_color = float_lerp(palette[color_idx], palette[next_idx], (t % 4) / 4.0)
+    bright_color = float_scale(mid_color, 1.5)
+    for row in range(4):
+        for col in range(8):
+            wave_offset = (col + wave_pos) % 8
+            intensity = abs(4 - wave_offset) / 4.0
+            if time_phase == 0:
+                pattern_value = (row + t) % 4
+            elif time_phase == 1:
+                pattern_value = (col + t) % 8
+            elif time_phase == 2:
+                pattern_value = (row + col + t) % 4
+            else:
+                pattern_value = int(abs(row - 1.5) + abs(col - 3.5) + t) % 4
+            factor = (pattern_value / 4.0 + intensity) / 2
+            if (row + col + sparkle_phase) % 3 == 0 and abs(4 - wave_offset) < 2:
+                out[row * 8 + col] = (bright_color, 0)
+            else:
+                out[row * 8 + col] = (float_scale(mid_color, factor), 0)
+    return out
+
+def compare(name, frame, expected, failures):
+    for idx in range(len(frame)):
+        want, tolerance = expected.get(idx, ((0, 0, 0), 0))
+        got = frame[idx]
+        if any(abs(got[i] - want[i]) > tolerance for i in range(3)):
+            failures.append("%s pixel %d: %r, float gives %r" % (name, idx, got, want))
+
+def check_helpers(failures):
+    # Quarter-step blends, as the modes use them, over every channel pair
+    for a in range(256):
+        for b in range(256):
+            for q in range(5):
+                got = lerp_color((a, 0, 0), (b, 0, 0), q * (ONE // 4))[0]
+                want = float_lerp((a, 0, 0), (b, 0, 0), q / 4)[0]
+                if got != want:
+                    failures.append("lerp_color(%d, %d, %d/4) = %d, float gives %d" % (a, b, q, got, want))
+            if qadd8(a, b) != min(255, a + b):
+                failures.append("qadd8(%d, %d) = %d" % (a, b, qadd8(a, b)))
+    # Eighth-step scales up to 1.5, as the gradient factors and the sparkle boost use them
+    for v in range(256):
+        for e in range(13):
+            got = scale_color((v, 0, 0), e * (ONE // 8))[0]
+            want = float_scale((v, 0, 0), e / 8)[0]
+            if got != want:
+                failures.append("scale_color(%d, %d/8) = %d, float gives %d" % (v, e, got, want))
+        if qadd8(v, v >> 1) != float_scale((v, 0, 0), 1.5)[0]:
+            failures.append("x1.5 boost of %d: %d" % (v, qadd8(v, v >> 1)))
+
+def main():
+    failures = []
+    check_helpers(failures)
+    frame = framebuffer(32)
+    fireworks = firework_mode(32)
+    gradient = gradient_mode(32)
+    frames = 0
+    for set_idx in range(len(FLAGS)):
+        palette = FLAGS[set_idx][1]
+        colors = distinct_colors(palette)
+        sparks = FLAGS[set_idx][2]
+        fireworks.prepare(set_idx)
+        gradient.prepare(set_idx)
+        # Two full cycles of each, so every blend step meets every phase
+        for t in range(2 * 16 * len(colors)):
+            fireworks.render(frame, t)
+            compare("mode 1 set %d t=%d" % (set_idx, t), frame, float_fireworks(colors, sparks, t), failures)
+            frames += 1
+        for t in range(2 * 4 * len(palette)):
+            gradient.render(frame, t)
+            compare("mode 2 set %d t=%d" % (set_idx, t), frame, float_gradient(palette, t), failures)
+            frames += 1
+    for line in failures[:20]:
+        print("x", line)
+    if failures:
+        print("o %d mismatches" % len(failures))
+        sys.exit(1)
+    print("o fixed-point color math matches the float formulas (%d frames)" % frames)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# Asset compiler: turns the declarative pattern description into bytes tables
+#
+#   python3 software/utility/compile_assets.py            # writes software/src/mylib/assets.py
+#   python3 software/utility/compile_assets.py --check    # exit 1 if assets.py is out of date
+#
+# software/assets/patterns.json describes:
+#   flags       rows of color letters (one string per grid row), the letters' colors, the
+#               palette as a string of letters (in order, repeats allowed) and the spark colors
+#   brightness  the brightness levels in percent and the bar length shown for each
+#   glyphs      the font: 4 strings per character, '#' lit and '.' dark
+# The generated module only holds bytes and str constants, so importing it builds no lists
+# or tuples: each table is a single object. A .mpy loaded from CIRCUITPY still puts them in
+# RAM; only freezing mylib into a custom firmware build keeps them in flash.
+import argparse
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.join(HERE, "..", "assets", "patterns.json")
+TARGET = os.path.join(HERE, "..", "src", "mylib", "assets.py")
+
+class asset_error(Exception):
+    pass
+
+def parse_color(text):
+    """'#rrggbb' -> (r, g, b)"""
+    if len(text) != 7 or text[0] != "#":
+        raise asset_error("bad color %r (want #rrggbb)" % text)
+    return tuple(int(text[i:i + 2], 16) for i in (1, 3, 5))
+
+def compile_flags(spec, width, height):
+    names = []
+    frames = bytearray()
+    palettes = []
+    sparks = []
+    for flag in spec:
+        name = flag["name"]
+        colors = {k: parse_color(v) for k, v in flag["colors"].items()}
+        colors.setdefault(".", (0, 0, 0))
+        rows = flag["rows"]
+        if len(rows) != height or any(len(r) != width for r in rows):
+            raise asset_error("%s: rows must be %d strings of %d letters" % (name, height, width))
+        for row in rows:
+            for letter in row:
+                if letter not in colors:
+                    raise asset_error("%s: no color for %r" % (name, letter))
+                frames += bytes(colors[letter])
+        palette = bytearray()
+        for letter in flag["palette"]:
+            if letter not in colors:
+                raise asset_error("%s: palette letter %r has no color" % (name, letter))
+            palette += bytes(colors[letter])
+        names.append(name)
+        palettes.append(bytes(palette))
+        sparks.append(b"".join(bytes(parse_color(c)) for c in flag["sparks"]))
+    return names, bytes(frames), palettes, sparks
+
+def compile_glyphs(spec, height):
+    """Glyph columns back to back (bit r of a column is row r) and where each glyph starts"""
+    chars = ""
+    data = bytearray()
+    starts = [0]
+    for ch, rows in spec.items():
+        if len(ch) != 1 or len(rows) != height or len({len(r) for r in rows}) != 1:
+            raise asset_error("glyph %r: want %d rows of equal width" % (ch, height))
+        for col in range(len(rows[0])):
+            bits = 0
+            for row in range(height):
+                if rows[row][col] == "#":
+                    bits |= 1 << row
+            data.append(bits)
+        chars += ch
+        starts.append(len(data))
+    if " " not in chars:
+        raise asset_error("the font needs a ' ' glyph (drawn for unknown characters)")
+    if starts[-1] > 255:
+        raise asset_error("font too large for one-byte offsets")
+    return chars, bytes(data), bytes(starts)
+
+def bytes_literal(data, indent="    ", per_line=16):
+    """A bytes constant as implicitly concatenated hex-escaped lines"""
+    if len(data) <= per_line:
+        return 'b"%s"' % "".join("\\x%02x" % b for b in data)
+    lines = []
+    for i in range(0, len(data), per_line):
+        lines.append('%sb"%s"' % (indent, "".join("\\x%02x" % b for b in data[i:i + per_line])))
+    return "(\n%s\n)" % "\n".join(lines)
+
+def generate(spec):
+    width = spec["width"]
+    height = spec["height"]
+    names, frames, palettes, sparks = compile_flags(spec["flags"], width, height)
+    chars, glyph_data, glyph_starts = compile_glyphs(spec["glyphs"], height)
+    levels = spec["brightness"]["percent"]
+    bars = spec["brightness"]["bar_pixels"]
+    if len(levels) != len(bars):
+        raise asset_error("brightness: one bar length per level")
+
+    out = []
+    out.append("# Generated by software/utility/compile_assets.py from software/assets/patterns.json")
+    out.append("# Do not edit: change the description and run the compiler again")
+    out.append("")
+    out.append("WIDTH = %d" % width)
+    out.append("HEIGHT = %d" % height)
+    out.append("FRAME_BYTES = %d" % (width * height * 3))
+    out.append("")
+    out.append("# Flags: names, rendered RGB frames back to back, palettes and spark colors as RGB triples")
+    out.append("FLAG_NAMES = %r" % (tuple(names),))
+    out.append("FLAG_FRAMES = %s" % bytes_literal(frames))
+    out.append("FLAG_PALETTES = (")
+    for p in palettes:
+        out.append("    %s," % bytes_literal(p))
+    out.append(")")
+    out.append("FLAG_SPARKS = (")
+    for p in sparks:
+        out.append("    %s," % bytes_literal(p))
+    out.append(")")
+    out.append("")
+    out.append("# Brightness levels in percent and the bar length shown for each")
+    out.append("BRIGHTNESS_PERCENT = %s" % bytes_literal(bytes(levels)))
+    out.append("BAR_PIXELS = %s" % bytes_literal(bytes(bars)))
+    out.append("")
+    out.append("# Font: glyph i has columns GLYPH_DATA[GLYPH_STARTS[i]:GLYPH_STARTS[i + 1]] (bit r is row r)")
+    out.append("GLYPH_CHARS = %r" % chars)
+    out.append("GLYPH_DATA = %s" % bytes_literal(glyph_data))
+    out.append("GLYPH_STARTS = %s" % bytes_literal(glyph_starts))
+    out.append("GLYPH_SPACING = %d" % spec.get("glyph_spacing", 1))
+    return "\n".join(out) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the pattern description into mylib/assets.py")
+    parser.add_argument("--source", default=SOURCE)
+    parser.add_argument("--output", default=TARGET)
+    parser.add_argument("--check", action="store_true", help="exit 1 if the output is out of date")
+    args = parser.parse_args()
+
+    with open(args.source) as f:
+        spec = json.load(f)
+    try:
+        text = generate(spec)
+    except (asset_error, KeyError) as e:
+        raise SystemExit("%s: %s" % (args.source, e))
+    try:
+        with open(args.output) as f:
+            current = f.read()
+    except OSError:
+        current = None
+    if args.check:
+        if current != text:
+            print("o %s is out of date: run %s" % (args.output, sys.argv[0]))
+            sys.exit(1)
+        print("o assets up to date")
+        return
+    if current == text:
+        print("o assets unchanged")
+        return
+    with open(args.output, "w") as f:
+        f.write(text)
+    print("o wrote", args.output)
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,12 @@
 
 # Change this to your project path
 PROJECT_DIR="./software/src"
+# Compiled copy of the project that gets deployed (mylib as .mpy)
+BUILD_DIR="./software/build"
 # CIRCUITPY drive (macOS path; on Linux use /media/$USER/CIRCUITPY)
 BOARD_PATH="/Volumes/CIRCUITPY"
+# mpy-cross matching the board's CircuitPython major version (from the Adafruit downloads)
+MPY_CROSS="${MPY_CROSS:-mpy-cross}"
 
 # Safety check
 if [ ! -d "$BOARD_PATH" ]; then
@@ -12,10 +16,33 @@ if [ ! -d "$BOARD_PATH" ]; then
   exit 1
 fi
 
+# Pattern tables: regenerate mylib/assets.py from software/assets/patterns.json
+python3 ./software/utility/compile_assets.py || exit 1
+
+# Precompile mylib: .mpy files skip parsing on the board (faster import, no compiler
+# RAM spike). They are still loaded into RAM; only modules frozen into the firmware stay in flash
+rm -rf "$BUILD_DIR"
+mkdir -p "$BUILD_DIR"
+rsync -a --exclude='.git*' --exclude='*.DS_Store' --exclude='__pycache__' \
+    --exclude='mylib/*.py' \
+    "$PROJECT_DIR"/ "$BUILD_DIR"/
+if command -v "$MPY_CROSS" > /dev/null; then
+  echo "🔧 Compiling mylib with $MPY_CROSS..."
+  mkdir -p "$BUILD_DIR/mylib"
+  for src in "$PROJECT_DIR"/mylib/*.py; do
+    name=$(basename "$src" .py)
+    "$MPY_CROSS" -o "$BUILD_DIR/mylib/$name.mpy" "$src" || exit 1
+  done
+  # A .py left on the board from a source deploy would be imported instead of the .mpy
+  rm -f "$BOARD_PATH"/mylib/*.py
+else
+  echo "⚠️  $MPY_CROSS not found, deploying mylib as source"
+  rsync -a --exclude='__pycache__' "$PROJECT_DIR"/mylib/ "$BUILD_DIR"/mylib/
+  rm -f "$BOARD_PATH"/mylib/*.mpy
+fi
+
 echo "🚀 Deploying code to Feather board..."
-rsync -av --exclude='.git*' \
-    --exclude='*.DS_Store' \
-    "$PROJECT_DIR"/ "$BOARD_PATH"/
+rsync -av "$BUILD_DIR"/ "$BOARD_PATH"/
 
 # Optional: small beep on success
 afplay /System/Library/Sounds/Glass.aiff 2>/dev/null || true
@@ -0,0 +1,311 @@
+# Host simulator: runs the light show on CPython with the hardware stubs
+#
+# Live in the terminal (ANSI truecolor), with scripted button presses:
+#   python3 software/utility/simulate.py --seconds 8 --press 1:0.2 --press 3:1.0
+# Export every mode and set as a PNG strip or an animated GIF:
+#   python3 software/utility/simulate.py --export out/ --format gif --seconds 3
+# Audio modes play a 16-bit WAV file through the stub mic with --wav song.wav
+# --virtual runs the live session on a virtual clock: no waiting, same frames
+# While the show is off the board light-sleeps; here a stub alarm waits for the next press
+import argparse
+import os
+import struct
+import sys
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from mylib.app import build  # noqa: E402
+from mylib.clock import system_clock, virtual_clock  # noqa: E402
+from mylib.hardware import led_stub, pixel_stub, mic_stub, alarm_stub  # noqa: E402
+from mylib.button import polled_input  # noqa: E402
+
+WIDTH = 8
+HEIGHT = 4
+BACKGROUND = (16, 16, 16)
+
+class script_button:
+    """Button stub pressed at scripted times: presses is a list of (start, duration) seconds"""
+    def __init__(self, presses, clock):
+        self.presses = presses
+        self.clock = clock
+        self.t0 = clock.monotonic()
+
+    @property
+    def value(self):
+        t = self.clock.monotonic() - self.t0
+        for start, duration in self.presses:
+            if start <= t < start + duration:
+                return False  # Pulled up: low while pressed
+        return True
+
+class sim_pixels(pixel_stub):
+    """pixel_stub that counts latches, so the simulator knows when a frame was shown"""
+    def __init__(self, n):
+        super().__init__(n)
+        self.shown = 0
+
+    def show(self):
+        self.shown += 1
+
+def frame_colors(show, pixel32, leds):
+    """The 32 colors to draw: the composited frame, or the LED driver values with --leds"""
+    if leds:
+        return list(pixel32.data)
+    buf = show.layers.out.buf
+    return [(buf[i], buf[i + 1], buf[i + 2]) for i in range(0, len(buf), 3)]
+
+def ansi_frame(colors, status):
+    lines = []
+    for row in range(HEIGHT):
+        cells = []
+        for col in range(WIDTH):
+            r, g, b = colors[row * WIDTH + col]
+            cells.append("\x1b[38;2;%d;%d;%dm██" % (r, g, b))
+        if row == 0:
+            r, g, b = status
+            cells.append("\x1b[0m  \x1b[38;2;%d;%d;%dm●" % (r, g, b))
+        lines.append("".join(cells) + "\x1b[0m")
+    return "\n".join(lines)
+
+def run_live(args):
+    clock = virtual_clock() if args.virtual else system_clock()
+    presses = [parse_press(p) for p in args.press]
+    button = script_button(presses, clock)
+    pixel = pixel_stub(1)
+    pixel32 = sim_pixels(32)
+    # The scripted button doubles as the pin the stub alarm watches
+    alarm = alarm_stub(clock, timeout=args.seconds)
+    show, handler, sched = build(led_stub(), polled_input(button, pin=button), pixel, pixel32,
+                                 make_mic(args), clock, alarm)
+    end = clock.monotonic() + args.seconds
+    shown = 0
+    first = True
+    while clock.monotonic() < end:
+        sched.run_due(clock.monotonic())
+        if pixel32.shown != shown:
+            shown = pixel32.shown
+            if not first:
+                sys.stdout.write("\x1b[%dA\r" % HEIGHT)
+            first = False
+            sys.stdout.write(ansi_frame(frame_colors(show, pixel32, args.leds), pixel.data[0]) + "\n")
+            sys.stdout.flush()
+        sched.sleep_until_next()
+    if show.power.sleeps:
+        print("o light sleep: %d times, %.1f s" % (show.power.sleeps, show.power.slept))
+
+def record(show, sched, pixel32, seconds, leds):
+    """Run the scheduler on its virtual clock and return [(duration, colors)] for every shown frame"""
+    clock = sched.clock
+    now = clock.monotonic()
+    end = now + seconds
+    frames = []
+    shown = pixel32.shown
+    while now < end:
+        sched.run_due(now)
+        if pixel32.shown != shown:
+            shown = pixel32.shown
+            frames.append([now, frame_colors(show, pixel32, leds)])
+        sched.sleep_until_next()
+        now = clock.monotonic()
+    # Turn timestamps into how long each frame stays up
+    for i, frame in enumerate(frames):
+        until = frames[i + 1][0] if i + 1 < len(frames) else end
+        frame[0] = until - frame[0]
+    return frames
+
+def run_export(args):
+    os.makedirs(args.export, exist_ok=True)
+    clock = virtual_clock()
+    pixel32 = sim_pixels(32)
+    show, handler, sched = build(led_stub(), script_button([], clock), pixel_stub(1), pixel32,
+                                 make_mic(args), clock)
+    brightness = show.current_brightness
+    for mode_idx, mode in enumerate(show.modes):
+        for set_idx in range(show.sets_per_mode[mode_idx]):
+            show.mode = mode_idx
+            show.set_idx = set_idx
+            show.mode_sets[mode_idx] = set_idx
+            show.palette_pos = 0
+            frames = record(show, sched, pixel32, args.seconds, args.leds)
+            name = "%d-%s-%d.%s" % (mode_idx, mode.name.replace(" ", "_"), set_idx, args.format)
+            path = os.path.join(args.export, name)
+            if args.format == "gif":
+                write_gif(path, frames, args.scale)
+            else:
+                write_png_strip(path, frames, args.scale, args.strip)
+            print("o wrote", path, "(%d frames)" % len(frames))
+    show.set_brightness(brightness)
+
+def parse_press(text):
+    """'start:duration' in seconds"""
+    start, duration = text.split(":")
+    return float(start), float(duration)
+
+def make_mic(args):
+    if args.wav:
+        return mic_stub(wav_path=args.wav)
+    return None
+
+# --- Image output (stdlib only) ---
+
+def render_image(colors, scale):
+    """One frame as rows of RGB tuples: each LED a scale x scale square on a dark grid"""
+    gap = max(1, scale // 6)
+    w = WIDTH * (scale + gap) + gap
+    h = HEIGHT * (scale + gap) + gap
+    rows = [[BACKGROUND] * w for _ in range(h)]
+    for row in range(HEIGHT):
+        for col in range(WIDTH):
+            color = tuple(colors[row * WIDTH + col])
+            y0 = gap + row * (scale + gap)
+            x0 = gap + col * (scale + gap)
+            for y in range(y0, y0 + scale):
+                rows[y][x0:x0 + scale] = [color] * scale
+    return rows
+
+def write_png_strip(path, frames, scale, count):
+    """count frames spread evenly over the recording, side by side"""
+    if not frames:
+        return
+    picks = [frames[i * len(frames) // count][1] for i in range(min(count, len(frames)))]
+    images = [render_image(c, scale) for c in picks]
+    rows = [sum((img[y] for img in images), []) for y in range(len(images[0]))]
+    write_png(path, rows)
+
+def write_png(path, rows):
+    width = len(rows[0])
+    raw = bytearray()
+    for row in rows:
+        raw.append(0)  # No filter
+        for r, g, b in row:
+            raw += bytes((r, g, b))
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xffffffff)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, len(rows), 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(bytes(raw), 9)))
+        f.write(chunk(b"IEND", b""))
+
+def write_gif(path, frames, scale):
+    """Animated GIF with one global palette; identical consecutive frames are merged"""
+    merged = []
+    for duration, colors in frames:
+        if merged and merged[-1][1] == colors:
+            merged[-1][0] += duration
+        else:
+            merged.append([duration, colors])
+    if not merged:
+        return
+    palette = [BACKGROUND]
+    index = {BACKGROUND: 0}
+    for _, colors in merged:
+        for c in colors:
+            c = tuple(c)
+            if c not in index:
+                if len(palette) == 256:
+                    # Out of palette entries: reuse the nearest color
+                    index[c] = min(range(256), key=lambda i: sum((a - b) ** 2 for a, b in zip(palette[i], c)))
+                    continue
+                index[c] = len(palette)
+                palette.append(c)
+    bits = 1
+    while (1 << bits) < len(palette):
+        bits += 1
+    palette += [(0, 0, 0)] * ((1 << bits) - len(palette))
+
+    first = render_image(merged[0][1], scale)
+    w = len(first[0])
+    h = len(first)
+    with open(path, "wb") as f:
+        f.write(b"GIF89a")
+        f.write(struct.pack("<HHBBB", w, h, 0x80 | ((bits - 1) << 4) | (bits - 1), 0, 0))
+        for c in palette:
+            f.write(bytes(c))
+        # Loop forever
+        f.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")
+        for duration, colors in merged:
+            delay = max(2, int(round(duration * 100)))
+            f.write(struct.pack("<BBBBHBB", 0x21, 0xf9, 4, 0, delay, 0, 0))
+            f.write(struct.pack("<BHHHHB", 0x2c, 0, 0, w, h, 0))
+            pixels = [index[c] for row in render_image(colors, scale) for c in row]
+            min_size = max(2, bits)
+            data = lzw_encode(pixels, min_size)
+            f.write(bytes((min_size,)))
+            for i in range(0, len(data), 255):
+                block = data[i:i + 255]
+                f.write(bytes((len(block),)) + block)
+            f.write(b"\x00")
+        f.write(b"\x3b")
+
+def lzw_encode(pixels, min_size):
+    clear = 1 << min_size
+    eoi = clear + 1
+    out = bytearray()
+    acc = 0
+    nbits = 0
+
+    def emit(code, size):
+        nonlocal acc, nbits
+        acc |= code << nbits
+        nbits += size
+        while nbits >= 8:
+            out.append(acc & 0xff)
+            acc >>= 8
+            nbits -= 8
+
+    size = min_size + 1
+    table = {(i,): i for i in range(clear)}
+    next_code = eoi + 1
+    emit(clear, size)
+    prefix = ()
+    for p in pixels:
+        key = prefix + (p,)
+        if key in table:
+            prefix = key
+            continue
+        emit(table[prefix], size)
+        if next_code == 4096:
+            # Table full: start over
+            emit(clear, size)
+            table = {(i,): i for i in range(clear)}
+            next_code = eoi + 1
+            size = min_size + 1
+        else:
+            table[key] = next_code
+            if next_code == (1 << size) and size < 12:
+                size += 1
+            next_code += 1
+        prefix = (p,)
+    if prefix:
+        emit(table[prefix], size)
+    emit(eoi, size)
+    if nbits:
+        out.append(acc & 0xff)
+    return bytes(out)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the light show on the host")
+    parser.add_argument("--seconds", type=float, default=5.0, help="run time (per mode and set when exporting)")
+    parser.add_argument("--press", action="append", default=[], metavar="START:DURATION",
+                        help="scripted button press, in seconds (repeatable)")
+    parser.add_argument("--export", metavar="DIR", help="write every mode and set to DIR instead of the terminal")
+    parser.add_argument("--format", choices=("png", "gif"), default="gif")
+    parser.add_argument("--scale", type=int, default=12, help="pixels per LED in exported images")
+    parser.add_argument("--strip", type=int, default=16, help="frames in a PNG strip")
+    parser.add_argument("--wav", help="16-bit WAV file played through the stub mic")
+    parser.add_argument("--virtual", action="store_true",
+                        help="run the live session on a virtual clock instead of in real time")
+    parser.add_argument("--leds", action="store_true",
+                        help="show LED driver values (after brightness and gamma) instead of the frame")
+    args = parser.parse_args()
+    if args.export:
+        run_export(args)
+    else:
+        run_live(args)
+
+if __name__ == "__main__":
+    main()